@@ -0,0 +1,213 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add the project root to the Python path
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+sys.path.append(str(Path(__file__).parent))
+
+# The stand-in server ignores the key, but requests need one
+os.environ.setdefault("RAPIDAPI_KEY", "benchmark")
+
+import matplotlib
+matplotlib.use("Agg")
+
+from stub_server import StubQuoteServer, make_quote
+from src.api.client import QuoteClient
+from src.api.yahoo_finance import (get_stock_data, parse_stock_data, parse_quotes_to_table,
+                                   save_to_json, load_from_json)
+from src.config.config import DEFAULT_TICKERS, FETCH_MAX_WORKERS
+from src.storage.snapshot import save_snapshot, open_snapshot
+from src.utils.logger import metrics
+from src.visualization.charts import render_charts
+
+DEFAULT_SIZES = [4, 100, 1000, 10000]
+
+def make_tickers(size):
+    """The default tickers for small runs, synthetic symbols beyond that."""
+    if size <= len(DEFAULT_TICKERS):
+        return DEFAULT_TICKERS[:size]
+    return [f"T{i:05d}" for i in range(size)]
+
+def timed(func, *args, **kwargs):
+    """Run ``func`` and return (result, seconds)."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def bench_fetch(server, tickers, max_serial, batch_size):
+    """Fetch throughput of get_stock_data in serial, concurrent and batched modes."""
+    modes = {
+        "concurrent": {"max_workers": FETCH_MAX_WORKERS, "batch_size": 1},
+        "batched": {"max_workers": FETCH_MAX_WORKERS, "batch_size": batch_size},
+    }
+    if len(tickers) <= max_serial:
+        modes = dict(serial={"max_workers": 1, "batch_size": 1}, **modes)
+    
+    results = []
+    for mode, options in modes.items():
+        with QuoteClient(server.address, pool_size=options["max_workers"], https=server.https) as client:
+            requests_before = server.requests
+            retries_before = metrics.snapshot()["counters"].get("http.retries", 0)
+            records, seconds = timed(get_stock_data, tickers, client=client, **options)
+        results.append({
+            "benchmark": "fetch", "mode": mode, "size": len(tickers), "seconds": seconds,
+            "tickers_per_second": len(tickers) / seconds if seconds else None,
+            "requests": server.requests - requests_before, "records": len(records),
+            "retries": metrics.snapshot()["counters"].get("http.retries", 0) - retries_before,
+        })
+    return results
+
+def bench_parse(tickers):
+    """Cost of parsing raw responses into dicts versus straight into columns."""
+    quotes = [{"body": [make_quote(ticker)]} for ticker in tickers]
+    _, dict_seconds = timed(lambda: [parse_stock_data(quote, quote["body"][0]["symbol"]) for quote in quotes])
+    _, table_seconds = timed(parse_quotes_to_table, quotes)
+    return [
+        {"benchmark": "parse", "mode": "dict", "size": len(tickers), "seconds": dict_seconds},
+        {"benchmark": "parse", "mode": "columnar", "size": len(tickers), "seconds": table_seconds},
+    ]
+
+def bench_storage(tickers, workdir):
+    """Save/load time of the JSON layer and of the binary snapshot."""
+    records = [parse_stock_data({"body": [make_quote(ticker)]}, ticker) for ticker in tickers]
+    json_path = str(Path(workdir) / "bench.json")
+    snapshot_path = Path(workdir) / "bench.dvs"
+    _, json_save = timed(save_to_json, records, json_path)
+    _, json_load = timed(load_from_json, json_path)
+    _, snapshot_save = timed(save_snapshot, records, snapshot_path)
+    
+    def load_snapshot():
+        snapshot = open_snapshot(snapshot_path)
+        return snapshot.to_dataframe()
+    _, snapshot_load = timed(load_snapshot)
+    size = len(tickers)
+    return [
+        {"benchmark": "save", "mode": "json", "size": size, "seconds": json_save},
+        {"benchmark": "load", "mode": "json", "size": size, "seconds": json_load},
+        {"benchmark": "save", "mode": "snapshot", "size": size, "seconds": snapshot_save},
+        {"benchmark": "load", "mode": "snapshot", "size": size, "seconds": snapshot_load},
+    ]
+
+def bench_charts(tickers, workdir):
+    """Per-chart render time of the generate_all_charts charts."""
+    records = [parse_stock_data({"body": [make_quote(ticker)]}, ticker) for ticker in tickers]
+    timings = render_charts(records, workdir, workers=1)
+    return [{"benchmark": "render", "mode": name, "size": len(tickers), "seconds": seconds}
+            for name, seconds in timings.items()]
+
+def parse_importtime(stderr):
+    """Total import seconds and top-level packages from ``python -X importtime`` output."""
+    total_us = 0
+    packages = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented; the top-level ones add up to the total
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+        packages.add(name.strip().split(".")[0])
+    return total_us / 1e6, packages
+
+def bench_startup(server, workdir):
+    """Wall time and import time of each fetch_stocks.py subcommand.
+
+    The commands run in fresh interpreters against the stand-in server,
+    with data and logs kept in ``workdir``.
+    """
+    env = dict(os.environ, RAPIDAPI_HOST=server.address, RAPIDAPI_HTTPS="1" if server.https else "0",
+               DATA_DIR=str(Path(workdir) / "data"), LOG_DIR=str(Path(workdir) / "logs"))
+    script = str(root_dir / "scripts" / "fetch_stocks.py")
+    commands = {
+        "fetch": ["fetch"],
+        "render": ["render", "--output-dir", str(Path(workdir) / "charts")],
+        "show": ["show"],
+    }
+    results = []
+    for name, command in commands.items():
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, "-X", "importtime", script] + command, env=env,
+                                 capture_output=True, text=True)
+        seconds = time.perf_counter() - start
+        import_seconds, packages = parse_importtime(process.stderr)
+        results.append({
+            "benchmark": "startup", "mode": name, "size": len(DEFAULT_TICKERS), "seconds": seconds,
+            "import_seconds": import_seconds, "returncode": process.returncode,
+            "loads_matplotlib": "matplotlib" in packages, "loads_pandas": "pandas" in packages,
+        })
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root_dir,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark fetch, parse, storage and chart rendering offline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="universe sizes to run")
+    parser.add_argument("--latency", type=float, default=0.005, help="stand-in server latency per request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing")
+    parser.add_argument("--batch-size", type=int, default=50, help="tickers per request in batched mode")
+    parser.add_argument("--max-serial", type=int, default=1000, help="largest universe fetched serially")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["fetch", "parse", "storage", "charts", "startup"],
+                        help="benchmarks to leave out")
+    parser.add_argument("--output", type=Path, help="results file (default: benchmarks/results/<time>.json)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    
+    started = datetime.now(timezone.utc)
+    results = []
+    with StubQuoteServer(latency=args.latency, error_rate=args.error_rate) as server, \
+            tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            tickers = make_tickers(size)
+            print(f"Universe of {size} tickers", file=sys.stderr)
+            if "fetch" not in args.skip:
+                results += bench_fetch(server, tickers, args.max_serial, args.batch_size)
+            if "parse" not in args.skip:
+                results += bench_parse(tickers)
+            if "storage" not in args.skip:
+                results += bench_storage(tickers, workdir)
+            if "charts" not in args.skip:
+                results += bench_charts(tickers, workdir)
+        if "startup" not in args.skip:
+            print("CLI startup", file=sys.stderr)
+            results += bench_startup(server, workdir)
+    
+    report = {
+        "meta": {
+            "started": started.isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+        },
+        "results": results,
+    }
+    output = args.output or root_dir / "benchmarks" / "results" / f"{started:%Y%m%dT%H%M%SZ}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as results_file:
+        json.dump(report, results_file, indent=4)
+    
+    for result in results:
+        print(f"{result['benchmark']:>7} {result['mode']:>24} {result['size']:>6} {result['seconds'] * 1000:10.1f} ms")
+    print(f"Results written to {output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import json
+import random
+import ssl
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+QUOTE_PATH = "/api/yahoo/qu/quote/"
+RATINGS = ["1.4 - Strong Buy", "1.9 - Buy", "2.1 - Buy", "2.6 - Hold", "3.2 - Hold", "4.0 - Sell"]
+
+def make_quote(symbol):
+    """Build a realistic quote for ``symbol``; the same symbol always gets the same base values."""
+    rng = random.Random(zlib.crc32(symbol.encode("utf-8")))
+    price = round(rng.uniform(5, 900), 2)
+    change = round(price * rng.uniform(-0.05, 0.05), 6)
+    low, high = sorted(round(price * rng.uniform(0.95, 1.05), 2) for _ in range(2))
+    low52, high52 = round(price * rng.uniform(0.5, 0.95), 2), round(price * rng.uniform(1.05, 1.8), 2)
+    eps = round(rng.uniform(-2, 20), 2)
+    volume = rng.randint(100_000, 150_000_000)
+    return {
+        "symbol": symbol,
+        "longName": f"{symbol.title()} Holdings Inc.",
+        "regularMarketPrice": price,
+        "regularMarketChange": change,
+        "regularMarketChangePercent": round(100 * change / (price - change), 6),
+        "regularMarketVolume": volume,
+        "regularMarketDayLow": low,
+        "regularMarketDayHigh": high,
+        "marketCap": rng.randint(10**8, 3 * 10**12),
+        "trailingPE": round(price / eps, 6) if eps > 0 else None,
+        "epsTrailingTwelveMonths": eps,
+        "fiftyTwoWeekLow": low52,
+        "fiftyTwoWeekHigh": high52,
+        "dividendYield": round(rng.uniform(0, 4), 2) if rng.random() < 0.6 else None,
+        "averageDailyVolume3Month": int(volume * rng.uniform(0.6, 1.4)),
+        "averageAnalystRating": rng.choice(RATINGS) if rng.random() < 0.9 else None,
+        "currency": "USD",
+    }
+
+class StubQuoteHandler(BaseHTTPRequestHandler):
+    """Answers /api/yahoo/qu/quote/{tickers} like the RapidAPI Yahoo Finance endpoint."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; do not let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if not self.path.startswith(QUOTE_PATH):
+            return self._send(404, {"message": "Not found"})
+        if server.error_rate and server.rng.random() < server.error_rate:
+            status = server.rng.choice([429, 500, 503])
+            with server.lock:
+                server.errors += 1
+            return self._send(status, {"message": "Injected error"},
+                              {"Retry-After": "1"} if status == 429 else None)
+        
+        symbols = [s for s in unquote(self.path[len(QUOTE_PATH):]).split(",") if s]
+        self._send(200, {"meta": {"version": "stub"}, "body": [make_quote(s.upper()) for s in symbols]})
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StubQuoteServer(ThreadingHTTPServer):
+    """Local stand-in for the quote API with configurable latency and error injection.
+
+    Serves HTTPS when ``certfile`` (and optionally ``keyfile``) is given,
+    plain HTTP otherwise. Use as a context manager to run it on a
+    background thread.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0,
+                 certfile=None, keyfile=None, seed=0):
+        super().__init__((host, port), StubQuoteHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.https = certfile is not None
+        if self.https:
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(certfile, keyfile)
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+        self._thread = None
+
+    @property
+    def address(self):
+        """host:port to pass to QuoteClient."""
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        self.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the RapidAPI quote endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 429/5xx")
+    parser.add_argument("--certfile", help="serve HTTPS with this certificate")
+    parser.add_argument("--keyfile", help="private key for --certfile")
+    args = parser.parse_args(argv)
+    
+    server = StubQuoteServer(args.host, args.port, args.latency, args.error_rate, args.certfile, args.keyfile)
+    scheme = "https" if server.https else "http"
+    print(f"Serving stub quotes on {scheme}://{server.address}{QUOTE_PATH}<tickers>", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
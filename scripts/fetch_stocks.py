@@ -1,46 +1,328 @@
+import argparse
 import sys
 import os
+import time
+from itertools import zip_longest
 from pathlib import Path
 
 # Add the project root to the Python path
 root_dir = Path(__file__).parent.parent
 sys.path.append(str(root_dir))
 
-from src.utils.logger import setup_logger
-from src.api.yahoo_finance import get_stock_data, save_to_json, display_results
-from src.visualization.charts import generate_all_charts
-from src.config.config import DEFAULT_TICKERS
+# Only light modules are imported here. Each subcommand imports what it needs
+# when it runs, so `fetch` never loads matplotlib or pandas.
+from src.utils.logger import setup_logger, stop_logging, metrics
+from src.utils.universe import (default_universe, load_universe, parse_shard, parse_shard_path, pending_files,
+                                pending_path, select_shard, shard_path, shard_files)
+from src.config.config import (DATA_DIR, SNAPSHOT_FILE, LOG_DIR, METRICS_FILE, METRICS_INTERVAL,
+                              CHART_SERVER_HOST, CHART_SERVER_PORT)
 
-def main():
+def shard_spec(text):
+    """argparse type for INDEX/COUNT shard specs."""
+    try:
+        return parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def parse_args(argv=None):
+    """Parse command-line arguments.
+    
+    Without a subcommand, quotes are fetched and the charts rendered, as before.
+    """
+    parser = argparse.ArgumentParser(description="Fetch stock quotes and generate charts.")
+    parser.add_argument("--force-refresh", action="store_true",
+                        help="ignore cached quotes and fetch every ticker from the API")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep running and poll tickers on a schedule")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap fetching, saving and chart rendering instead of running them one after another")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    fetch_parser = subparsers.add_parser("fetch", help="fetch quotes and save them (no charts)")
+    fetch_parser.add_argument("tickers", nargs="*", help="tickers to fetch (default: TICKERS_FILE or DEFAULT_TICKERS)")
+    fetch_parser.add_argument("--force-refresh", action="store_true", default=argparse.SUPPRESS,
+                              help="ignore cached quotes and fetch every ticker from the API")
+    fetch_parser.add_argument("--tickers-file", help="file listing the tickers to fetch (default: TICKERS_FILE)")
+    fetch_parser.add_argument("--shard", type=shard_spec, metavar="INDEX/COUNT",
+                              help="fetch only this hash shard of the tickers, e.g. 0/4, and save it "
+                                   "for the merge command")
+    
+    render_parser = subparsers.add_parser("render", help="render charts from the saved snapshot")
+    render_parser.add_argument("--output-dir", default=str(root_dir / "charts"), help="directory for the PNG files")
+    render_parser.add_argument("--force", action="store_true", help="re-render charts even if unchanged")
+    render_parser.add_argument("--workers", type=int, help="chart render processes")
+    
+    subparsers.add_parser("show", help="print the saved snapshot")
+    
+    merge_parser = subparsers.add_parser("merge", help="combine the outputs of sharded fetch runs")
+    merge_parser.add_argument("--shard-count", type=int, help="expected number of shards; fail if any is missing")
+    
+    daemon_parser = subparsers.add_parser("daemon", help="keep running and poll tickers on a schedule")
+    daemon_parser.add_argument("tickers", nargs="*", help="tickers to poll (default: TICKERS_FILE or DEFAULT_TICKERS)")
+    
+    serve_parser = subparsers.add_parser("serve", help="serve charts rendered on demand over HTTP")
+    serve_parser.add_argument("--host", help="address to listen on (default: CHART_SERVER_HOST)")
+    serve_parser.add_argument("--port", type=int, help="port to listen on (default: CHART_SERVER_PORT)")
+    return parser.parse_args(argv)
+
+def fetch(tickers, logger, force_refresh=False, shard=None):
+    """Fetch quotes and save them to the history, the snapshot and the JSON export.
+    
+    With ``shard`` (index, count) only that hash shard of ``tickers`` is
+    fetched, with its own quote cache, and saved to the shard directory;
+    the merge command later combines the shards into the snapshot and
+    history. Returns the fetched records.
+    """
+    from src.api.cache import QuoteCache
+    from src.api.yahoo_finance import fetch_table_with_cache, save_to_json, display_results
+    from src.storage.history import SnapshotStore
+    from src.storage.snapshot import save_snapshot
+    
+    if shard is not None:
+        index, count = shard
+        tickers = select_shard(tickers, index, count)
+        logger.info(f"Shard {index}/{count}: {len(tickers)} tickers")
+        cache = QuoteCache(shard_path(index, count, suffix=".cache.json")).load()
+    else:
+        cache = QuoteCache().load()
+    logger.info(f"Fetching data for tickers: {tickers}")
+    # Quotes stay columnar for storage; record dicts are only for the JSON export and display
+    table, fetched, results = fetch_table_with_cache(tickers, cache=cache, force_refresh=force_refresh)
+    cache.save()
+    logger.info(f"Quote cache: {cache.stats()}")
+    
+    if not results:
+        logger.error("No stock data retrieved")
+        return results
+    
+    if shard is not None:
+        save_snapshot(table, shard_path(*shard))
+        # The newly fetched quotes wait here until merge appends them to the
+        # history; every run gets its own file so none is lost before a merge
+        if len(fetched):
+            save_snapshot(fetched, pending_path(*shard, time.time()))
+        return results
+    
+    # Save data: append the newly fetched quotes to the history (cached ones
+    # are already there), refresh the latest snapshot and export it as JSON
+    SnapshotStore().append(fetched)
+    save_snapshot(table, Path(DATA_DIR) / SNAPSHOT_FILE)
+    save_to_json(results)
+    
+    # Display results
+    display_results(results)
+    return results
+
+def run_pipelined(tickers, logger, force_refresh=False):
+    """Fetch, save and render as a streaming pipeline (see run_pipeline)."""
+    from src.api.cache import QuoteCache
+    from src.pipeline.streaming import run_pipeline
+    from src.visualization.charts import generate_analytics_charts
+    
+    logger.info(f"Running pipeline for tickers: {tickers}")
+    output_dir = root_dir / "charts"
+    cache = QuoteCache().load()
+    try:
+        results = run_pipeline(tickers, output_dir=output_dir, cache=cache, force_refresh=force_refresh)
+    finally:
+        cache.save()
+    logger.info(f"Quote cache: {cache.stats()}")
+    if not results:
+        logger.error("No stock data retrieved")
+        return results
+    generate_analytics_charts(output_dir=output_dir)
+    return results
+
+def render(logger, output_dir=None, force=False, workers=None):
+    """Render the charts from the saved snapshot."""
+    from src.visualization.charts import generate_all_charts, generate_analytics_charts
+    
+    logger.info("Generating visualization charts")
+    output_dir = output_dir or root_dir / "charts"
+    generated = generate_all_charts(output_dir=output_dir, force=force, workers=workers)
+    generate_analytics_charts(output_dir=output_dir, force=force)
+    return generated
+
+def merge(logger, shard_count=None):
+    """Combine the shard snapshots into the snapshot, the history and the JSON export.
+    
+    Only the quotes each shard fetched since the last merge are appended to
+    the history, so merging again does not append the same quotes twice.
+    """
+    from src.api.yahoo_finance import save_to_json
+    from src.models.stock import StockTable
+    from src.storage.history import SnapshotStore
+    from src.storage.snapshot import merge_snapshots, open_snapshot, save_snapshot
+    
+    paths = shard_files(count=shard_count)
+    if not paths:
+        logger.error("No shard outputs to merge; run fetch --shard first")
+        return []
+    results = merge_snapshots(paths)
+    if not results:
+        logger.error("Shard outputs hold no stock data")
+        return results
+    
+    # The shards' first runs since the last merge make up one snapshot of the
+    # universe, their second runs the next one, and so on. Each is appended
+    # once, under the time its last shard was fetched: separate timestamps per
+    # shard would read as snapshots where the other shards' prices stood still
+    runs = [pending_files(*parse_shard_path(path), shard_dir=path.parent) for path in paths]
+    store = SnapshotStore()
+    for shard_runs in zip_longest(*runs):
+        shard_runs = [run for run in shard_runs if run is not None]
+        snapshots = [(path, open_snapshot(path)) for _, path in shard_runs]
+        snapshots = [(path, snapshot) for path, snapshot in snapshots if snapshot is not None]
+        store.append(StockTable.concat([snapshot.table for _, snapshot in snapshots]),
+                     max(timestamp for timestamp, _ in shard_runs))
+        for path, snapshot in snapshots:
+            snapshot.close()
+            path.unlink()
+    save_snapshot(results, Path(DATA_DIR) / SNAPSHOT_FILE)
+    save_to_json(results)
+    logger.info(f"Merged {len(paths)} shards into {len(results)} quotes")
+    return results
+
+def show(logger):
+    """Print the saved snapshot without fetching."""
+    from src.api.yahoo_finance import display_results, load_from_json
+    from src.storage.snapshot import open_snapshot
+    
+    snapshot = open_snapshot(Path(DATA_DIR) / SNAPSHOT_FILE)
+    if snapshot is not None:
+        results = snapshot.to_records()
+        snapshot.close()
+    else:
+        results = load_from_json()
+    if not results:
+        logger.error("No saved stock data; run the fetch command first")
+        return False
+    display_results(results)
+    return True
+
+def run_daemon(tickers, logger):
+    """Poll tickers on their schedule, persisting and re-rendering only changed quotes.
+    
+    The API client, quote cache, snapshot store, dashboard figure and
+    rolling analytics are created once and reused on every cycle; the
+    analytics are updated incrementally with each batch of changed quotes.
+    """
+    from src.api.cache import QuoteCache
+    from src.api.yahoo_finance import fetch_tickers, save_to_json
+    from src.storage.history import SnapshotStore
+    from src.storage.snapshot import save_snapshot
+    from src.analytics.timeseries import RollingAnalytics
+    from src.utils.scheduler import PollScheduler
+    from src.visualization.charts import generate_analytics_charts
+    from src.visualization.dashboard import Dashboard
+    
+    cache = QuoteCache().load()
+    store = SnapshotStore()
+    dashboard = Dashboard()
+    scheduler = PollScheduler(tickers)
+    analytics = RollingAnalytics.from_history(store)
+    snapshot_path = Path(DATA_DIR) / SNAPSHOT_FILE
+    dashboard_path = root_dir / "charts" / "dashboard.png"
+    dashboard_path.parent.mkdir(exist_ok=True)
+    latest = {}
+    next_metrics = time.time() + METRICS_INTERVAL
+    
+    logger.info(f"Polling {len(tickers)} tickers; press Ctrl+C to stop")
+    try:
+        while True:
+            due = scheduler.due()
+            if due:
+                fetched = {record["symbol"].upper(): record for record in fetch_tickers(due)}
+                changed = []
+                for ticker in due:
+                    record = fetched.get(ticker.upper())
+                    scheduler.schedule(ticker, record or latest.get(ticker.upper()))
+                    if record is None:
+                        continue
+                    record = cache.put(record)
+                    if latest.get(ticker.upper()) != record:
+                        latest[ticker.upper()] = record
+                        changed.append(record)
+                
+                if changed:
+                    # Only the changed quotes go to the history
+                    timestamp = time.time()
+                    store.append(changed, timestamp)
+                    analytics.update(changed, timestamp)
+                    snapshot = list(latest.values())
+                    save_snapshot(snapshot, snapshot_path)
+                    save_to_json(snapshot)
+                    dashboard.update(snapshot)
+                    dashboard.save(dashboard_path)
+                    generate_analytics_charts(output_dir=dashboard_path.parent, analytics=analytics)
+                    logger.info("%d of %d polled quotes changed", len(changed), len(due))
+                else:
+                    logger.info("No changes in %d polled quotes", len(due))
+            
+            if time.time() >= next_metrics:
+                metrics.dump(METRICS_FILE)
+                next_metrics = time.time() + METRICS_INTERVAL
+            
+            next_poll = scheduler.next_poll()
+            wake = min(next_poll, next_metrics) if next_poll else next_metrics
+            time.sleep(max(0.0, wake - time.time()))
+    except KeyboardInterrupt:
+        logger.info("Stopping daemon")
+    finally:
+        cache.save()
+        dashboard.close()
+        metrics.dump(METRICS_FILE)
+
+def main(argv=None):
     """Main function to run the stock data retrieval and visualization process."""
+    args = parse_args(argv)
+    
     # Setup logging
-    logger = setup_logger(log_file=root_dir/"logs"/"stock_app.log")
+    logger = setup_logger(log_file=Path(LOG_DIR) / "stock_app.log")
     logger.info("Starting stock data application")
     
+    if args.command == "daemon" or (args.command is None and args.daemon):
+        try:
+            run_daemon(getattr(args, "tickers", None) or default_universe(), logger)
+        finally:
+            stop_logging()
+        return
+    
+    if args.command == "serve":
+        from src.visualization.server import serve
+        try:
+            serve(args.host or CHART_SERVER_HOST, args.port or CHART_SERVER_PORT)
+        finally:
+            metrics.dump(METRICS_FILE)
+            stop_logging()
+        return
+    
     try:
-        # Fetch and process stock data
-        logger.info(f"Fetching data for tickers: {DEFAULT_TICKERS}")
-        results = get_stock_data(DEFAULT_TICKERS)
-        
-        if not results:
-            logger.error("No stock data retrieved")
-            return
-            
-        # Save data
-        save_to_json(results)
-        
-        # Display results
-        display_results(results)
-        
-        # Generate charts
-        logger.info("Generating visualization charts")
-        charts_dir = root_dir / "charts"
-        generate_all_charts(output_dir=charts_dir)
-        
-        logger.info("Stock data processing completed successfully")
-        
+        if args.command == "fetch":
+            tickers = args.tickers or (load_universe(args.tickers_file) if args.tickers_file else default_universe())
+            fetch(tickers, logger, force_refresh=args.force_refresh, shard=args.shard)
+        elif args.command == "render":
+            render(logger, output_dir=args.output_dir, force=args.force, workers=args.workers)
+        elif args.command == "merge":
+            merge(logger, shard_count=args.shard_count)
+        elif args.command == "show":
+            show(logger)
+        elif args.pipeline:
+            if run_pipelined(default_universe(), logger, force_refresh=args.force_refresh):
+                logger.info("Stock data processing completed successfully")
+        else:
+            # Fetch and process stock data, then generate charts
+            if not fetch(default_universe(), logger, force_refresh=args.force_refresh):
+                return
+            render(logger)
+            logger.info("Stock data processing completed successfully")
+    
     except Exception as e:
         logger.error(f"An error occurred: {e}", exc_info=True)
+    finally:
+        metrics.dump(METRICS_FILE)
+        logger.info(f"Metrics written to {METRICS_FILE}")
+        stop_logging()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,174 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def minmax_downsample(x, y, bins):
+    """Keep the lowest and highest point of each of ``bins`` equal-count bins.
+
+    Returns at most ``2 * bins`` points in their original order, so peaks
+    and dips survive however many points fall into one pixel column.
+    """
+    n = len(x)
+    if n <= 2 * bins:
+        return x, y
+    edges = np.linspace(0, n, bins + 1).astype(np.intp)
+    low = np.where(np.isnan(y), np.inf, y)
+    high = np.where(np.isnan(y), -np.inf, y)
+    mins = edges[:-1] + np.array([low[a:b].argmin() for a, b in zip(edges[:-1], edges[1:])])
+    maxs = edges[:-1] + np.array([high[a:b].argmax() for a, b in zip(edges[:-1], edges[1:])])
+    keep = np.unique(np.concatenate([mins, maxs]))
+    return x[keep], y[keep]
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling to ``threshold`` points.
+
+    Keeps the first and last point and, from each bucket in between, the
+    point forming the largest triangle with the previously kept point and
+    the average of the next bucket. Smoother than min/max binning while
+    still following the shape of the line. NaN values are dropped.
+    """
+    valid = ~np.isnan(y)
+    x, y = x[valid], y[valid]
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    xf = x.astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    keep = np.empty(threshold, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        following = slice(end, edges[i + 2] if i + 2 < len(edges) else n)
+        average_x, average_y = xf[following].mean(), y[following].mean()
+        areas = np.abs((xf[previous] - average_x) * (y[start:end] - y[previous])
+                       - (xf[previous] - xf[start:end]) * (average_y - y[previous]))
+        previous = start + int(areas.argmax())
+        keep[i + 1] = previous
+    return x[keep], y[keep]
+
+class SeriesPyramid:
+    """Min/max pyramid of one sorted series for fast zoomable downsampling.
+
+    Level ``k`` holds, for every block of 2**k consecutive points, the
+    indices of its lowest and highest value. Each level is built once from
+    the level below (O(n) for all levels together) and cached, so a view
+    of any time range at any pixel width only touches about two blocks
+    per pixel: drawing cost depends on the image width, not the data size.
+    """
+
+    def __init__(self, x, y):
+        self.x = np.asarray(x)
+        self.y = np.asarray(y, dtype=np.float64)
+        # NaNs never win a min or max comparison
+        self._low = np.where(np.isnan(self.y), np.inf, self.y)
+        self._high = np.where(np.isnan(self.y), -np.inf, self.y)
+        index = np.arange(len(self.y))
+        self._levels = [(index, index)]
+        self._lttb = OrderedDict()
+
+    def __len__(self):
+        return len(self.y)
+
+    def level(self, k):
+        """(min indices, max indices) per block of 2**k points."""
+        while len(self._levels) <= k:
+            mins, maxs = self._levels[-1]
+            if len(mins) % 2:
+                mins, maxs = np.append(mins, mins[-1]), np.append(maxs, maxs[-1])
+            low, high = self._low, self._high
+            left_min, right_min = mins[0::2], mins[1::2]
+            left_max, right_max = maxs[0::2], maxs[1::2]
+            self._levels.append((np.where(low[right_min] < low[left_min], right_min, left_min),
+                                 np.where(high[right_max] > high[left_max], right_max, left_max)))
+        return self._levels[k]
+
+    def _range(self, start, end):
+        first = 0 if start is None else int(np.searchsorted(self.x, start, side='left'))
+        last = len(self.x) if end is None else int(np.searchsorted(self.x, end, side='right'))
+        return first, last
+
+    def view(self, width, start=None, end=None, method='minmax'):
+        """Downsample the points between ``start`` and ``end`` for ``width`` pixels.
+
+        ``method`` is 'minmax' (pyramid level plus min/max binning, at most
+        two points per pixel) or 'lttb' (about one point per pixel; results
+        are cached per range and width).
+        """
+        first, last = self._range(start, end)
+        count = last - first
+        width = max(1, int(width))
+        if count <= 2 * width:
+            return self.x[first:last], self.y[first:last]
+        if method == 'lttb':
+            key = (first, last, width)
+            if key not in self._lttb:
+                self._lttb[key] = lttb(self.x[first:last], self.y[first:last], width)
+                if len(self._lttb) > 32:
+                    self._lttb.popitem(last=False)
+            self._lttb.move_to_end(key)
+            return self._lttb[key]
+
+        # The coarsest level that still has at least two blocks per pixel
+        k = max(0, int(np.log2(count / (2 * width))))
+        mins, maxs = self.level(k)
+        blocks = slice(first >> k, ((last - 1) >> k) + 1)
+        keep = np.unique(np.concatenate([mins[blocks], maxs[blocks]]))
+        # Edge blocks can reach outside the range
+        keep = keep[(keep >= first) & (keep < last)]
+        return minmax_downsample(self.x[keep], self.y[keep], width)
+
+class SeriesCache:
+    """Price series pyramids per symbol, rebuilt only when the history changes.
+
+    Keyed on the store's version (its committed row count), so repeated
+    renders of an unchanged history skip both the query and the pyramid
+    building.
+    """
+
+    def __init__(self, max_series=1000):
+        self.max_series = max_series
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, store, symbols, field="price"):
+        """Return {symbol: SeriesPyramid} for the symbols that have history."""
+        version = store.version()
+        root = str(store.root)
+        result = {}
+        missing = []
+        with self._lock:
+            for symbol in symbols:
+                entry = self._series.get((root, field, symbol))
+                if entry is not None and entry[0] == version:
+                    self._series.move_to_end((root, field, symbol))
+                    result[symbol] = entry[1]
+                else:
+                    missing.append(symbol)
+        if not missing:
+            return result
+
+        rows = store.query(missing, columns=[field])
+        order = np.argsort(rows["timestamp"], kind='stable')
+        timestamps = rows["timestamp"][order].astype("datetime64[ms]")
+        values = rows[field][order]
+        names = rows["symbol"][order]
+        with self._lock:
+            for symbol in missing:
+                mask = names == symbol
+                if not mask.any():
+                    continue
+                pyramid = SeriesPyramid(timestamps[mask], values[mask])
+                self._series[(root, field, symbol)] = (version, pyramid)
+                result[symbol] = pyramid
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+        logger.debug("Built %d price series at history version %d", len(missing), version)
+        return result
+
+# Process-wide cache used by the time-series charts
+series_cache = SeriesCache()
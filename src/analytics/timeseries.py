@@ -0,0 +1,305 @@
+import logging
+
+import numpy as np
+
+from src.config.config import ANALYTICS_WINDOW
+from src.models.stock import StockTable
+
+logger = logging.getLogger(__name__)
+
+# All functions below take a (snapshots x symbols) float array, oldest row
+# first, with NaN where a symbol has no price yet.
+
+def price_matrix(timestamps, symbols, prices):
+    """Pivot long history rows into (timestamps, symbols, snapshots x symbols prices).
+
+    Snapshots only hold the quotes that changed, so a symbol missing from
+    a snapshot keeps its previous price (forward fill).
+    """
+    times, time_index = np.unique(np.asarray(timestamps), return_inverse=True)
+    names, symbol_index = np.unique(np.asarray(symbols, dtype=object).astype(str), return_inverse=True)
+    matrix = np.full((len(times), len(names)), np.nan)
+    matrix[time_index, symbol_index] = prices
+    return times, names, forward_fill(matrix)
+
+def forward_fill(matrix):
+    """Replace NaNs by the last earlier value in the same column."""
+    valid = ~np.isnan(matrix)
+    rows = np.where(valid, np.arange(len(matrix))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled = matrix[rows, np.arange(matrix.shape[1])]
+    # Columns stay NaN before their first price
+    filled[~np.maximum.accumulate(valid, axis=0)] = np.nan
+    return filled
+
+def returns(prices):
+    """Simple returns between consecutive snapshots (one row fewer than ``prices``)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return prices[1:] / prices[:-1] - 1
+
+def rolling_returns(prices, window):
+    """Return over the last ``window`` snapshots; NaN for the first ``window`` rows."""
+    result = np.full(prices.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[window:] = prices[window:] / prices[:-window] - 1
+    return result
+
+def _rolling_sum(values, window):
+    """Sum over the last ``window`` rows, ignoring NaNs, and the count of non-NaN values."""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    return sums, counts
+
+def moving_average(prices, window):
+    """Moving average of the last ``window`` snapshots (fewer at the start)."""
+    sums, counts = _rolling_sum(prices, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return sums / counts
+
+def volatility(prices, window):
+    """Standard deviation of the per-snapshot returns over the last ``window`` returns.
+
+    Row 0 (no return yet) and windows with fewer than two returns are NaN.
+    """
+    step = returns(prices)
+    sums, counts = _rolling_sum(step, window)
+    squares, _ = _rolling_sum(step ** 2, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = (squares - sums ** 2 / counts) / (counts - 1)
+    result = np.full(prices.shape, np.nan)
+    result[1:] = np.sqrt(np.maximum(variance, 0.0))
+    result[1:][counts < 2] = np.nan
+    return result
+
+def drawdown(prices):
+    """Fall from the running peak price (0 at a new high, -0.25 when 25% below it)."""
+    peaks = np.fmax.accumulate(prices, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return prices / peaks - 1
+
+def correlation(step_returns):
+    """Cross-symbol correlation matrix of returns (symbols x symbols).
+
+    Each pair only uses the snapshots where both symbols have a return;
+    pairs with fewer than two such snapshots are NaN.
+    """
+    valid = ~np.isnan(step_returns)
+    values = np.where(valid, step_returns, 0.0)
+    weights = valid.astype(float)
+    return _correlation(weights.T @ weights, values.T @ weights, (values ** 2).T @ weights, values.T @ values)
+
+def _correlation(counts, sums, squares, products):
+    """Pairwise correlation from co-observed counts and sums.
+
+    ``sums[i, j]`` and ``squares[i, j]`` hold the sum and sum of squares of
+    symbol i over the snapshots where j is also observed.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = products - sums * sums.T / counts
+        variance_i = squares - sums ** 2 / counts
+        result = covariance / np.sqrt(variance_i * variance_i.T)
+    result[counts < 2] = np.nan
+    return np.clip(result, -1.0, 1.0)
+
+class RollingAnalytics:
+    """Rolling analytics for a whole universe, updated one snapshot at a time.
+
+    Keeps ring buffers of the last ``window`` + 1 prices and last
+    ``window`` returns of every symbol plus running sums over them, so
+    ``update`` adds the new snapshot and subtracts the one leaving the
+    window instead of recomputing it: O(symbols) for the moving average,
+    return and volatility and O(symbols²) for the correlation sums. The
+    sums are rebuilt from the buffers every ``window`` updates so
+    floating-point drift cannot build up. Symbols seen for the first time
+    are added on the fly; a symbol missing from a snapshot keeps its last
+    price. Drawdowns are measured from the peak since the first snapshot.
+    """
+
+    def __init__(self, window=ANALYTICS_WINDOW):
+        self.window = window
+        self.symbols = []
+        self._index = {}
+        self.updates = 0
+        self.timestamp = None
+        self._prices = np.full((window + 1, 0), np.nan)
+        self._returns = np.full((window, 0), np.nan)
+        self._last = np.full(0, np.nan)
+        self._peak = np.full(0, np.nan)
+        self._max_drawdown = np.zeros(0)
+        self._resync()
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @classmethod
+    def from_prices(cls, prices, symbols, window=ANALYTICS_WINDOW, timestamp=None):
+        """Build the state from a (snapshots x symbols) price history in one vectorized pass."""
+        analytics = cls(window)
+        analytics._grow(list(symbols))
+        prices = forward_fill(np.asarray(prices, dtype=float))
+        count = len(prices)
+        if not count:
+            return analytics
+        rows = np.arange(max(0, count - window - 1), count)
+        analytics._prices[rows % (window + 1)] = prices[rows]
+        step = returns(prices)
+        rows = np.arange(max(0, len(step) - window), len(step))
+        analytics._returns[rows % window] = step[rows]
+        analytics._last = prices[-1].copy()
+        analytics._peak = np.fmax.reduce(prices, axis=0)
+        with np.errstate(invalid='ignore'):
+            analytics._max_drawdown = np.fmin(np.fmin.reduce(drawdown(prices), axis=0), 0.0)
+        analytics.updates = count
+        analytics.timestamp = timestamp
+        analytics._resync()
+        return analytics
+
+    @classmethod
+    def from_history(cls, store, window=ANALYTICS_WINDOW, symbols=None, start=None, end=None):
+        """Build the state from the prices in a SnapshotStore."""
+        rows = store.query(symbols, start, end, columns=["price"])
+        times, names, prices = price_matrix(rows["timestamp"], rows["symbol"], rows["price"])
+        return cls.from_prices(prices, names, window, timestamp=times[-1] if len(times) else None)
+
+    def _grow(self, symbols):
+        """Add columns for symbols not seen yet."""
+        new = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self._index]
+        if not new:
+            return
+        for symbol in new:
+            self._index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+
+        def pad(array, value):
+            return np.concatenate([array, np.full(array.shape[:-1] + (len(new),), value)], axis=-1)
+        self._prices = pad(self._prices, np.nan)
+        self._returns = pad(self._returns, np.nan)
+        self._last = pad(self._last, np.nan)
+        self._peak = pad(self._peak, np.nan)
+        self._max_drawdown = pad(self._max_drawdown, 0.0)
+        self._resync()
+
+    def _resync(self):
+        """Recompute the running sums from the ring buffers."""
+        prices = self._prices
+        if self.updates > self.window:
+            # The slot written next holds the price that already left the window
+            prices = np.delete(prices, self.updates % (self.window + 1), axis=0)
+        valid = ~np.isnan(prices)
+        self._price_sum = np.where(valid, prices, 0.0).sum(axis=0)
+        self._price_count = valid.sum(axis=0)
+
+        n = len(self.symbols)
+        for name in ("_return_count", "_return_sum", "_return_squares", "_return_products"):
+            setattr(self, name, np.zeros((n, n)))
+        for step in self._returns:
+            self._add_return(step, 1.0)
+
+    def _add_return(self, step, sign):
+        """Add (sign 1) or remove (sign -1) one return vector from the correlation sums."""
+        valid = ~np.isnan(step)
+        if not valid.any():
+            return
+        values = np.where(valid, step, 0.0)
+        weights = valid.astype(float)
+        self._return_count += sign * np.outer(weights, weights)
+        self._return_sum += sign * np.outer(values, weights)
+        self._return_squares += sign * np.outer(values ** 2, weights)
+        self._return_products += sign * np.outer(values, values)
+
+    def update(self, data, timestamp=None):
+        """Add one snapshot: a StockTable, a list of records or a {symbol: price} dict."""
+        if isinstance(data, dict):
+            symbols, values = list(data), np.asarray(list(data.values()), dtype=float)
+        else:
+            table = data if isinstance(data, StockTable) else StockTable.from_records(data)
+            symbols, values = list(table.strings("symbol")), np.asarray(table.column("price"), dtype=float)
+        self._grow(symbols)
+
+        prices = self._last.copy()
+        index = np.array([self._index[symbol] for symbol in symbols], dtype=np.intp)
+        known = ~np.isnan(values)
+        prices[index[known]] = values[known]
+
+        # Price window: the oldest price leaves once the window is full
+        slot = self.updates % (self.window + 1)
+        self._prices[slot] = prices
+        if self.updates >= self.window:
+            leaving = self._prices[(slot + 1) % (self.window + 1)]
+            gone = ~np.isnan(leaving)
+            self._price_sum -= np.where(gone, leaving, 0.0)
+            self._price_count -= gone
+        valid = ~np.isnan(prices)
+        self._price_sum += np.where(valid, prices, 0.0)
+        self._price_count += valid
+
+        # Return window: replace the return from ``window`` updates ago
+        if self.updates:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                step = prices / self._last - 1
+            return_slot = (self.updates - 1) % self.window
+            self._add_return(self._returns[return_slot], -1.0)
+            self._returns[return_slot] = step
+            self._add_return(step, 1.0)
+
+        self._last = prices
+        self._peak = np.fmax(self._peak, prices)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._max_drawdown = np.fmin(self._max_drawdown, prices / self._peak - 1)
+        self.timestamp = timestamp
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self._resync()
+        return self
+
+    def moving_average(self):
+        """Mean price over the last ``window`` snapshots, per symbol."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._price_sum / self._price_count
+
+    def rolling_return(self):
+        """Return over the last ``window`` snapshots; NaN until that many have been seen."""
+        if self.updates <= self.window:
+            return np.full(len(self.symbols), np.nan)
+        oldest = self._prices[self.updates % (self.window + 1)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._last / oldest - 1
+
+    def volatility(self):
+        """Standard deviation of the last ``window`` per-snapshot returns."""
+        counts = np.diag(self._return_count)
+        sums = np.diag(self._return_sum)
+        squares = np.diag(self._return_squares)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = (squares - sums ** 2 / counts) / (counts - 1)
+        result = np.sqrt(np.maximum(variance, 0.0))
+        result[counts < 2] = np.nan
+        return result
+
+    def drawdown(self):
+        """Current fall from each symbol's peak price."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._last / self._peak - 1
+
+    def max_drawdown(self):
+        """Deepest drawdown seen so far, per symbol."""
+        return self._max_drawdown.copy()
+
+    def correlation(self):
+        """Correlation matrix of the last ``window`` returns (symbols x symbols)."""
+        return _correlation(self._return_count, self._return_sum, self._return_squares, self._return_products)
+
+    def summary(self):
+        """Per-symbol metrics as a dict of equal-length arrays (one row per symbol)."""
+        return {
+            "symbol": np.array(self.symbols, dtype=object),
+            "price": self._last.copy(),
+            "moving_average": self.moving_average(),
+            "rolling_return": self.rolling_return(),
+            "volatility": self.volatility(),
+            "drawdown": self.drawdown(),
+            "max_drawdown": self.max_drawdown(),
+        }
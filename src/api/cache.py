@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from src.config.config import QUOTE_CACHE_FILE, QUOTE_CACHE_MAX_ENTRIES, QUOTE_CACHE_TTLS
+from src.utils.logger import metrics
+
+logger = logging.getLogger(__name__)
+
+# Record fields grouped by how quickly they go stale
+FIELD_GROUPS = {
+    "price": ("price", "change", "percent", "volume", "range"),
+    "fundamentals": ("market_cap", "pe_ratio", "eps", "52wk_range", "dividend_yield", "avg_volume"),
+    "profile": ("name", "analyst_rating", "currency"),
+}
+
+def _is_missing(value):
+    # Ranges of missing numbers are formatted as "None - None"
+    return value is None or value == "None - None"
+
+class QuoteCache:
+    """LRU cache of parsed quote records with per-field-group TTLs.
+
+    Each entry remembers when every field group was last fetched, so a
+    lookup can ask only for the groups it needs (e.g. ``groups=["profile"]``
+    for analyst ratings) and still hit after the prices have expired.
+    The cache is persisted as JSON between runs with ``load``/``save``.
+    """
+
+    def __init__(self, path=QUOTE_CACHE_FILE, max_entries=QUOTE_CACHE_MAX_ENTRIES, ttls=None):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.ttls = dict(QUOTE_CACHE_TTLS if ttls is None else ttls)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, entry, groups, now):
+        fetched = entry["fetched"]
+        return all(now - fetched.get(group, 0) < self.ttls[group] for group in groups)
+
+    def _stale_groups(self, entry, now):
+        return [group for group in FIELD_GROUPS if not self._is_fresh(entry, [group], now)]
+
+    def get(self, symbol, groups=None, now=None):
+        """Return the cached record for ``symbol`` if the requested groups are fresh."""
+        groups = FIELD_GROUPS if groups is None else groups
+        now = time.time() if now is None else now
+        key = symbol.upper()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self._is_fresh(entry, groups, now):
+                self.misses += 1
+                metrics.increment("cache.misses")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.increment("cache.hits")
+            return dict(entry["record"])
+
+    def put(self, record, now=None):
+        """Store a freshly fetched record and return it merged with the cached one.
+
+        Fields the API left out of the response (e.g. a missing analyst
+        rating or P/E) keep their cached value while their group's TTL has
+        not expired, so fundamentals and profile data outlive patchy quotes
+        for their longer TTLs. A group is marked as fetched only when the
+        response carried at least one of its fields (or its cached values
+        had expired). The least recently used entries are evicted.
+        """
+        now = time.time() if now is None else now
+        key = record["symbol"].upper()
+        record = dict(record)
+        with self._lock:
+            entry = self._entries.get(key)
+            fetched = {}
+            for group, fields in FIELD_GROUPS.items():
+                missing = [field for field in fields if _is_missing(record.get(field))]
+                if entry is not None and self._is_fresh(entry, [group], now):
+                    for field in missing:
+                        record[field] = entry["record"].get(field)
+                    if len(missing) == len(fields):
+                        fetched[group] = entry["fetched"][group]
+                        continue
+                fetched[group] = now
+            self._entries[key] = {"record": dict(record), "fetched": fetched}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                metrics.increment("cache.evictions")
+        return record
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+    def load(self):
+        """Load entries from disk, dropping ones whose every group has expired."""
+        if not self.path or not self.path.exists():
+            return self
+        try:
+            with open(self.path, 'r') as cache_file:
+                entries = json.load(cache_file)
+        except Exception as e:
+            logger.error(f"Error loading quote cache from {self.path}: {e}")
+            return self
+        
+        now = time.time()
+        with self._lock:
+            for key, entry in entries:
+                if len(self._stale_groups(entry, now)) < len(FIELD_GROUPS):
+                    self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info(f"Loaded {len(self._entries)} cached quotes from {self.path}")
+        return self
+
+    def save(self):
+        """Write entries to disk in LRU order, replacing the previous file atomically."""
+        if not self.path:
+            return False
+        try:
+            self.path.parent.mkdir(exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with self._lock:
+                entries = list(self._entries.items())
+            with open(tmp_path, 'w') as cache_file:
+                json.dump(entries, cache_file)
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving quote cache to {self.path}: {e}")
+            return False
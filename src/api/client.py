@@ -0,0 +1,208 @@
+import atexit
+import http.client
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from src.api.throttle import CircuitBreaker, RateLimiter
+from src.config.config import (RAPIDAPI_HOST, RAPIDAPI_HTTPS, HTTP_POOL_SIZE, HTTP_TIMEOUT, HTTP_MAX_RETRIES,
+                               HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX)
+from src.utils.logger import metrics
+
+logger = logging.getLogger(__name__)
+
+# Errors raised when the server has silently dropped a kept-alive connection
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.ResponseNotReady,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+# Statuses worth retrying: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class APIError(Exception):
+    """The quote API answered with an error status."""
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, base=HTTP_BACKOFF_BASE, cap=HTTP_BACKOFF_MAX):
+    """Full-jitter exponential backoff: a random delay up to base * 2**attempt, capped."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class QuoteClient:
+    """Thread-safe pool of keep-alive HTTP(S) connections to the quote API.
+
+    At most ``pool_size`` connections are open at once; callers beyond that
+    wait for a connection to be returned. A request on a connection the
+    server has closed is retried once on a fresh connection.
+
+    ``get_json`` additionally paces requests through ``rate_limiter``,
+    retries throttled (429), 5xx and network failures up to ``max_retries``
+    times with jittered exponential backoff (waiting at least Retry-After),
+    and fails fast while ``breaker`` is open. Both are off when None.
+    """
+
+    def __init__(self, host=RAPIDAPI_HOST, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT, https=RAPIDAPI_HTTPS,
+                 ssl_context=None, rate_limiter=None, breaker=None, max_retries=HTTP_MAX_RETRIES):
+        self.host = host
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.https = https
+        self.ssl_context = ssl_context
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._closed = False
+
+    def _connect(self):
+        """Open a new connection to the API host."""
+        if self.https:
+            return http.client.HTTPSConnection(self.host, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(self.host, timeout=self.timeout)
+
+    def _acquire(self):
+        """Take an idle connection from the pool, or open one. Returns (conn, reused)."""
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._connect(), False
+
+    def _release(self, conn, reuse):
+        """Return a connection to the pool, or close it if it cannot be reused."""
+        if reuse and not self._closed:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def request(self, path, headers=None):
+        """Send a GET request and return (status, response headers, body bytes)."""
+        conn, reused = self._acquire()
+        reuse = False
+        try:
+            try:
+                conn.request("GET", path, headers=headers or {})
+                res = conn.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                metrics.increment("http.reconnects")
+                logger.debug("Connection to %s was dropped, reconnecting", self.host)
+                conn.close()
+                conn = self._connect()
+                conn.request("GET", path, headers=headers or {})
+                res = conn.getresponse()
+            body = res.read()
+            reuse = not res.will_close
+            return res.status, dict(res.getheaders()), body
+        finally:
+            self._release(conn, reuse)
+
+    def _send(self, path, headers):
+        """One request through the rate limiter and circuit breaker; raise APIError on error statuses."""
+        if self.breaker is not None:
+            self.breaker.before_request()
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            status, response_headers, body = self.request(path, headers)
+        except (OSError, http.client.HTTPException):
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Not the API's fault (quota used up, bad headers, ...): the request
+            # was never answered, so it must not hold the half-open trial
+            if self.breaker is not None:
+                self.breaker.cancel_trial()
+            raise
+        
+        if status >= 500:
+            if self.breaker is not None:
+                self.breaker.record_failure()
+        elif self.breaker is not None:
+            self.breaker.record_success()
+        if status == 429:
+            metrics.increment("http.rate_limited")
+        if status >= 400:
+            raise APIError(status, body[:200].decode("utf-8", "replace"),
+                           retry_after_seconds(response_headers.get("Retry-After")))
+        return body
+
+    def get_json(self, path, headers=None):
+        """Send a GET request with retries and decode the JSON response body."""
+        attempt = 0
+        while True:
+            try:
+                body = self._send(path, headers)
+                return json.loads(body.decode("utf-8"))
+            except (APIError, OSError, http.client.HTTPException) as e:
+                status = getattr(e, "status", None)
+                if attempt >= self.max_retries or (status is not None and status not in RETRY_STATUSES):
+                    raise
+                delay = backoff_delay(attempt)
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after is not None:
+                    delay = min(max(delay, retry_after), HTTP_BACKOFF_MAX)
+                    if self.rate_limiter is not None:
+                        # Hold back the other threads too
+                        self.rate_limiter.pause(delay)
+                attempt += 1
+                metrics.increment("http.retries")
+                logger.warning("Request %s failed (%s); retry %d of %d in %.1f s",
+                               path, e, attempt, self.max_retries, delay)
+                time.sleep(delay)
+
+    def close(self):
+        """Close all idle connections; connections in use are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide shared QuoteClient."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            rate_limiter = RateLimiter()
+            atexit.register(rate_limiter.save)
+            _default_client = QuoteClient(rate_limiter=rate_limiter, breaker=CircuitBreaker())
+        return _default_client
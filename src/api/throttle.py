@@ -0,0 +1,224 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: usage files are merged without a lock
+    fcntl = None
+
+from src.config.config import (API_REQUESTS_PER_SECOND, API_REQUESTS_PER_MONTH, API_USAGE_FILE,
+                               CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+from src.utils.logger import metrics
+
+logger = logging.getLogger(__name__)
+
+class QuotaExceededError(Exception):
+    """The monthly request quota has been used up."""
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is open; the API is not called until it resets."""
+
+class TokenBucket:
+    """Thread-safe token bucket allowing ``rate`` requests per second.
+
+    Up to ``capacity`` tokens (one second's worth by default) can be spent
+    in a burst; after that ``acquire`` blocks until tokens refill, so callers
+    run at the highest rate the bucket allows. A rate of 0 means no limit
+    (``pause`` still applies).
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._not_before = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token, possibly going into debt; return the seconds to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.rate:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                self._tokens -= 1
+                wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._not_before - now)
+
+    def acquire(self):
+        """Block until a request may be sent; return the seconds waited."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return max(0.0, wait)
+
+    def pause(self, seconds):
+        """Hold back every caller for ``seconds``, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self._not_before = max(self._not_before, time.monotonic() + seconds)
+
+class MonthlyQuota:
+    """Count requests against a per-calendar-month limit (UTC), persisted between runs.
+
+    Several processes (e.g. shard workers) may share the usage file: ``save``
+    adds the requests this process made since its last save to the count
+    on disk, under a file lock, instead of overwriting it.
+    """
+
+    def __init__(self, limit, path=API_USAGE_FILE):
+        self.limit = limit
+        self.path = Path(path) if path else None
+        self.month = self._current_month()
+        self.used = 0
+        # Part of ``used`` already on disk
+        self._saved = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _current_month():
+        return datetime.now(timezone.utc).strftime("%Y-%m")
+
+    def take(self):
+        """Count one request, raising QuotaExceededError if the limit is reached."""
+        with self._lock:
+            month = self._current_month()
+            if month != self.month:
+                self.month, self.used, self._saved = month, 0, 0
+            if self.limit and self.used >= self.limit:
+                raise QuotaExceededError(f"Monthly quota of {self.limit} requests used up for {self.month}")
+            self.used += 1
+
+    def remaining(self):
+        """Requests left this month, or None without a limit."""
+        return max(0, self.limit - self.used) if self.limit else None
+
+    def _read(self):
+        """This month's usage on disk (0 for another month or no file)."""
+        if not self.path.exists():
+            return 0
+        with open(self.path, 'r') as usage_file:
+            usage = json.load(usage_file)
+        return int(usage.get("used", 0)) if usage.get("month") == self.month else 0
+
+    def load(self):
+        """Load this month's usage from disk."""
+        if not self.path:
+            return self
+        try:
+            with self._lock:
+                self.used = self._saved = self._read()
+        except Exception as e:
+            logger.error(f"Error loading API usage from {self.path}: {e}")
+        return self
+
+    def save(self):
+        """Add the requests made since the last save to the usage on disk, atomically."""
+        if not self.path:
+            return False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + f".{os.getpid()}.tmp")
+            lock_path = self.path.with_suffix(self.path.suffix + ".lock")
+            with open(lock_path, 'a') as lock_file, self._lock:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Other processes may have saved since this one loaded
+                try:
+                    on_disk = self._read()
+                except ValueError as e:
+                    logger.warning(f"Replacing unreadable API usage file {self.path}: {e}")
+                    on_disk = self._saved
+                used = on_disk + self.used - self._saved
+                with open(tmp_path, 'w') as usage_file:
+                    json.dump({"month": self.month, "used": used}, usage_file)
+                os.replace(tmp_path, self.path)
+                self.used = self._saved = used
+            return True
+        except Exception as e:
+            logger.error(f"Error saving API usage to {self.path}: {e}")
+            return False
+
+class RateLimiter:
+    """Per-second token bucket plus monthly quota for the quote API plan."""
+
+    def __init__(self, per_second=API_REQUESTS_PER_SECOND, per_month=API_REQUESTS_PER_MONTH,
+                 usage_file=API_USAGE_FILE):
+        self.bucket = TokenBucket(per_second)
+        self.quota = MonthlyQuota(per_month, usage_file).load()
+
+    def acquire(self):
+        """Wait for a request slot and count it against the monthly quota."""
+        self.quota.take()
+        waited = self.bucket.acquire()
+        if waited > 0:
+            metrics.increment("http.throttled")
+        return waited
+
+    def pause(self, seconds):
+        self.bucket.pause(seconds)
+
+    def save(self):
+        return self.quota.save()
+
+class CircuitBreaker:
+    """Stop calling the API after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests fail fast with CircuitOpenError. Once ``reset_timeout``
+    seconds have passed one trial request is let through (half-open): a
+    success closes the circuit, a failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_request(self):
+        """Raise CircuitOpenError unless a request may be sent now."""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial:
+                metrics.increment("http.short_circuited")
+                raise CircuitOpenError(f"Circuit open after {self.failures} consecutive failures")
+            self._trial = True
+
+    def cancel_trial(self):
+        """Give up the half-open trial slot of a request that was never answered."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("Quote API recovered; circuit closed")
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    logger.warning("Quote API failing; circuit opened for %.0f s", self.reset_timeout)
+                self.opened_at = time.monotonic()
+                self._trial = False
+                metrics.increment("http.circuit_opened")
@@ -1,13 +1,38 @@
-import http.client
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-from src.config.config import RAPIDAPI_KEY, RAPIDAPI_HOST, DATA_DIR
-from src.models.stock import Stock
+import numpy as np
+
+from src.api.client import get_client
+from src.config.config import RAPIDAPI_KEY, RAPIDAPI_HOST, DATA_DIR, FETCH_MAX_WORKERS, QUOTE_BATCH_SIZE
+from src.models.stock import NUMERIC_FIELDS, STRING_FIELDS, Stock, StockTable, encode_strings
+from src.utils.logger import metrics
 
 logger = logging.getLogger(__name__)
 
+# API quote keys feeding each StockTable column
+QUOTE_COLUMNS = {
+    "symbol": "symbol",
+    "name": "longName",
+    "price": "regularMarketPrice",
+    "change": "regularMarketChange",
+    "percent": "regularMarketChangePercent",
+    "volume": "regularMarketVolume",
+    "day_low": "regularMarketDayLow",
+    "day_high": "regularMarketDayHigh",
+    "market_cap": "marketCap",
+    "pe_ratio": "trailingPE",
+    "eps": "epsTrailingTwelveMonths",
+    "week52_low": "fiftyTwoWeekLow",
+    "week52_high": "fiftyTwoWeekHigh",
+    "dividend_yield": "dividendYield",
+    "avg_volume": "averageDailyVolume3Month",
+    "analyst_rating": "averageAnalystRating",
+    "currency": "currency",
+}
+
 def get_headers():
     """Get API headers using credentials from config."""
     return {
@@ -15,68 +40,341 @@ def get_headers():
         'x-rapidapi-host': RAPIDAPI_HOST
     }
 
-def fetch_stock_data(ticker, headers=None):
+def fetch_stock_data(ticker, headers=None, client=None):
     """Fetch stock data for a single ticker."""
     if headers is None:
         headers = get_headers()
-        
-    conn = http.client.HTTPSConnection(RAPIDAPI_HOST)
+    if client is None:
+        client = get_client()
     
+    metrics.increment("fetch.requests")
     try:
-        conn.request("GET", f"/api/yahoo/qu/quote/{ticker}", headers=headers)
-        res = conn.getresponse()
-        data = res.read()
-        return json.loads(data.decode("utf-8"))
+        with metrics.timer("fetch"):
+            return client.get_json(f"/api/yahoo/qu/quote/{ticker}", headers=headers)
     except Exception as e:
-        logger.error(f"Error fetching data for {ticker}: {e}")
+        metrics.increment("fetch.errors")
+        logger.error("Error fetching data for %s: %s", ticker, e)
         return None
-    finally:
-        conn.close()
+
+def quote_to_record(q):
+    """Convert a single quote from the API 'body' array into a record dict."""
+    return {
+        # Basic stock info
+        "symbol": q["symbol"],
+        "name": q.get("longName"),
+        "price": q.get("regularMarketPrice"),
+        "change": q.get("regularMarketChange"),
+        "percent": q.get("regularMarketChangePercent"),
+        "volume": q.get("regularMarketVolume"),
+        "range": f"{q.get('regularMarketDayLow')} - {q.get('regularMarketDayHigh')}",
+        
+        # Additional financial data
+        "market_cap": q.get("marketCap"),
+        "pe_ratio": q.get("trailingPE"),
+        "eps": q.get("epsTrailingTwelveMonths"),
+        "52wk_range": f"{q.get('fiftyTwoWeekLow')} - {q.get('fiftyTwoWeekHigh')}",
+        "dividend_yield": q.get("dividendYield"),
+        "avg_volume": q.get("averageDailyVolume3Month"),
+        "analyst_rating": q.get("averageAnalystRating"),
+        "currency": q.get("currency")
+    }
 
 def parse_stock_data(quote, ticker):
     """Parse the API response into a structured format."""
     try:
         q = quote['body'][0]  # Data is in the 'body' array
-        return {
-            # Basic stock info
-            "symbol": q["symbol"],
-            "name": q.get("longName"),
-            "price": q.get("regularMarketPrice"),
-            "change": q.get("regularMarketChange"),
-            "percent": q.get("regularMarketChangePercent"),
-            "volume": q.get("regularMarketVolume"),
-            "range": f"{q.get('regularMarketDayLow')} - {q.get('regularMarketDayHigh')}",
-            
-            # Additional financial data
-            "market_cap": q.get("marketCap"),
-            "pe_ratio": q.get("trailingPE"),
-            "eps": q.get("epsTrailingTwelveMonths"),
-            "52wk_range": f"{q.get('fiftyTwoWeekLow')} - {q.get('fiftyTwoWeekHigh')}",
-            "dividend_yield": q.get("dividendYield"),
-            "avg_volume": q.get("averageDailyVolume3Month"),
-            "analyst_rating": q.get("averageAnalystRating"),
-            "currency": q.get("currency")
-        }
+        return quote_to_record(q)
     except (KeyError, IndexError) as e:
-        logger.error(f"Error parsing data for {ticker}: {e}")
-        logger.debug(f"Response structure: {quote}")
+        metrics.increment("parse.errors")
+        logger.error("Error parsing data for %s: %s", ticker, e)
+        logger.debug("Response structure: %s", quote)
         return None
 
-def get_stock_data(tickers):
-    """Get stock data for a list of tickers."""
-    headers = get_headers()
-    results = []
+def parse_stock_batch(quote, tickers):
+    """Split a multi-symbol API response into records, in the order of ``tickers``.
+
+    Symbols missing from the response are logged and left out.
+    """
+    try:
+        by_symbol = {}
+        for q in quote['body']:
+            try:
+                by_symbol[q["symbol"].upper()] = quote_to_record(q)
+            except (KeyError, AttributeError) as e:
+                metrics.increment("parse.errors")
+                logger.error("Error parsing quote in batch response: %s", e)
+    except (KeyError, TypeError) as e:
+        metrics.increment("parse.errors")
+        logger.error("Error parsing batch data for %s: %s", ', '.join(tickers), e)
+        logger.debug("Response structure: %s", quote)
+        return []
     
+    results = []
     for ticker in tickers:
-        logger.info(f"Fetching data for {ticker}...")
-        quote = fetch_stock_data(ticker, headers)
-        if quote:
-            stock_data = parse_stock_data(quote, ticker)
-            if stock_data:
-                results.append(stock_data)
+        record = by_symbol.get(ticker.upper())
+        if record is None:
+            metrics.increment("parse.missing")
+            logger.error("No data for %s in batch response", ticker)
+        else:
+            results.append(record)
+    return results
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def parse_quotes_to_table(quotes):
+    """Parse many raw API responses straight into a StockTable.
+
+    Quotes from every response's 'body' array are written column by column
+    into preallocated float64 arrays (NaN for missing values) and
+    dictionary-encoded string columns (code -1 for missing), without
+    building a record dict per quote. Quotes without a symbol are dropped.
+    """
+    body = []
+    for quote in quotes:
+        try:
+            body.extend(q for q in quote['body'] if isinstance(q, dict))
+        except (KeyError, TypeError) as e:
+            metrics.increment("parse.errors")
+            logger.error("Error parsing quote response: %s", e)
+    body = [q for q in body if q.get("symbol")]
+    n = len(body)
     
+    numeric = {}
+    for field in NUMERIC_FIELDS:
+        key = QUOTE_COLUMNS[field]
+        values = [q.get(key) for q in body]
+        column = np.empty(n, dtype=np.float64)
+        try:
+            column[:] = values
+        except (TypeError, ValueError):
+            # A non-numeric value somewhere in the column: convert one by one
+            column[:] = [_to_float(value) for value in values]
+        numeric[field] = column
+    
+    codes = {}
+    categories = {}
+    for field in STRING_FIELDS:
+        key = QUOTE_COLUMNS[field]
+        codes[field], categories[field] = encode_strings([q.get(key) for q in body])
+    return StockTable(numeric, codes, categories)
+
+def fetch_and_parse(ticker, headers=None, client=None):
+    """Fetch and parse a single ticker, returning None on failure."""
+    logger.info("Fetching data for %s...", ticker)
+    quote = fetch_stock_data(ticker, headers, client)
+    if not quote:
+        return None
+    with metrics.timer("parse"):
+        return parse_stock_data(quote, ticker)
+
+def fetch_and_parse_batch(tickers, headers=None, client=None):
+    """Fetch several tickers in one comma-separated request and parse them."""
+    logger.info("Fetching data for %d tickers (%s...%s)...", len(tickers), tickers[0], tickers[-1])
+    quote = fetch_stock_data(",".join(tickers), headers, client)
+    if not quote:
+        return []
+    with metrics.timer("parse"):
+        return parse_stock_batch(quote, tickers)
+
+def chunk_tickers(tickers, size):
+    """Split a ticker list into consecutive chunks of at most ``size`` tickers."""
+    size = max(1, size)
+    return [tickers[i:i + size] for i in range(0, len(tickers), size)]
+
+def get_stock_data(tickers, max_workers=None, client=None, batch_size=None, cache=None, force_refresh=False):
+    """Get stock data for a list of tickers (see fetch_with_cache)."""
+    results, _ = fetch_with_cache(tickers, max_workers, client, batch_size, cache, force_refresh)
     return results
 
+def fetch_with_cache(tickers, max_workers=None, client=None, batch_size=None, cache=None, force_refresh=False):
+    """Get stock data for a list of tickers, returning (results, fetched).
+
+    Tickers are fetched concurrently on a thread pool of up to ``max_workers``
+    threads (defaults to FETCH_MAX_WORKERS); pass ``max_workers=1`` to fetch
+    them serially. With ``batch_size`` above 1 (defaults to QUOTE_BATCH_SIZE)
+    tickers are packed into comma-separated requests of that many symbols.
+    Results keep the input order; tickers that still fail after the client's
+    retries are logged (and counted as ``fetch.failed_tickers``) and skipped.
+    Requests go through ``client`` (the shared keep-alive QuoteClient by default).
+    If a QuoteCache is given, fresh cached records are returned without a
+    request unless ``force_refresh`` is set, and fetched records are cached.
+    ``fetched`` holds only the records that came from the API, i.e. the
+    ones that are new to the history.
+    """
+    tickers = list(tickers)
+    cached = _cached_records(tickers, cache, force_refresh)
+    fetched = fetch_tickers([t for t in tickers if t not in cached], max_workers, client, batch_size)
+    if cache is not None:
+        # Fills fields the API left out from the still-fresh cached quote
+        fetched = [cache.put(record) for record in fetched]
+    
+    by_symbol = {record["symbol"].upper(): record for record in fetched}
+    results = []
+    failed = []
+    for ticker in tickers:
+        record = cached.get(ticker) or by_symbol.get(ticker.upper())
+        if record is not None:
+            results.append(record)
+        else:
+            failed.append(ticker)
+    _log_failed(failed, tickers)
+    return results, fetched
+
+def _cached_records(tickers, cache, force_refresh=False):
+    """Fresh cached records by ticker (none with ``force_refresh``)."""
+    cached = {}
+    if cache is not None and not force_refresh:
+        for ticker in tickers:
+            record = cache.get(ticker)
+            if record is not None:
+                cached[ticker] = record
+        if cached:
+            logger.info(f"Using cached data for {len(cached)} of {len(tickers)} tickers")
+    return cached
+
+def _log_failed(failed, tickers):
+    if failed:
+        metrics.increment("fetch.failed_tickers", len(failed))
+        logger.warning("No data for %d of %d tickers: %s", len(failed), len(tickers), ", ".join(failed))
+
+def run_concurrently(work, units, max_workers=None):
+    """Apply ``work`` to each unit on a bounded thread pool, keeping the input order."""
+    if max_workers is None:
+        max_workers = FETCH_MAX_WORKERS
+    max_workers = max(1, min(max_workers, len(units)))
+    if max_workers == 1:
+        return [work(unit) for unit in units]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch") as executor:
+        return list(executor.map(work, units))
+
+def fetch_quotes(tickers, max_workers=None, client=None, batch_size=None):
+    """Fetch raw API responses for tickers, concurrently and optionally batched.
+
+    Failed requests are skipped; the responses keep the input order.
+    """
+    headers = get_headers()
+    if client is None:
+        client = get_client()
+    if batch_size is None:
+        batch_size = QUOTE_BATCH_SIZE
+    
+    units = [",".join(chunk) for chunk in chunk_tickers(list(tickers), batch_size)]
+    quotes = run_concurrently(lambda unit: fetch_stock_data(unit, headers, client), units, max_workers)
+    return [quote for quote in quotes if quote]
+
+def get_stock_table(tickers, max_workers=None, client=None, batch_size=None):
+    """Fetch tickers and parse them directly into a columnar StockTable.
+
+    This is the large-universe counterpart of get_stock_data: no per-ticker
+    record dicts are built. Rows follow the order of the API responses.
+    """
+    quotes = fetch_quotes(tickers, max_workers, client, batch_size)
+    with metrics.timer("parse"):
+        return parse_quotes_to_table(quotes)
+
+def fetch_table_with_cache(tickers, max_workers=None, client=None, batch_size=None, cache=None,
+                           force_refresh=False):
+    """Columnar counterpart of fetch_with_cache, returning (table, fetched, records).
+
+    Quotes from the API are parsed straight into a StockTable (see
+    get_stock_table) and cached quotes are added to it, with rows in the
+    order of ``tickers``. ``fetched`` is the table of the quotes that came
+    from the API, i.e. the rows new to the history. ``records`` are the
+    rows of ``table`` as record dicts, built once for the cache, the JSON
+    export and display.
+    """
+    tickers = list(tickers)
+    cached = _cached_records(tickers, cache, force_refresh)
+    fetched = get_stock_table([t for t in tickers if t not in cached], max_workers, client, batch_size)
+    fetched, records = cache_table(fetched.select(t for t in tickers if t not in cached), cache)
+    
+    table = StockTable.concat([fetched, StockTable.from_records(list(cached.values()))]).select(tickers)
+    by_symbol = {record["symbol"].upper(): record for record in records + list(cached.values())}
+    records = [by_symbol[symbol.upper()] for symbol in table.strings("symbol")]
+    _log_failed([ticker for ticker in tickers if ticker.upper() not in by_symbol], tickers)
+    return table, fetched, records
+
+def cache_table(table, cache):
+    """Cache the quotes of a freshly fetched table; return (table, records).
+
+    Fields the API left out are filled from the still-fresh cached quote
+    (see QuoteCache.put), in which case the table is rebuilt from the
+    merged records.
+    """
+    records = table.to_records()
+    if cache is not None and records:
+        merged = [cache.put(record) for record in records]
+        if merged != records:
+            return StockTable.from_records(merged), merged
+    return table, records
+
+def _fetch_work(tickers, client=None, batch_size=None):
+    """Split tickers into request units; return (units, work) where work(unit) returns parsed records."""
+    headers = get_headers()
+    if client is None:
+        client = get_client()
+    if batch_size is None:
+        batch_size = QUOTE_BATCH_SIZE
+
+    if batch_size > 1:
+        units = chunk_tickers(tickers, batch_size)
+
+        def work(chunk):
+            return fetch_and_parse_batch(chunk, headers, client)
+    else:
+        units = tickers
+
+        def work(ticker):
+            stock_data = fetch_and_parse(ticker, headers, client)
+            return [stock_data] if stock_data else []
+    return units, work
+
+def fetch_tickers(tickers, max_workers=None, client=None, batch_size=None):
+    """Fetch and parse tickers from the API, bypassing any cache (see get_stock_data)."""
+    units, work = _fetch_work(tickers, client, batch_size)
+    parsed = run_concurrently(work, units, max_workers)
+    return [stock_data for records in parsed for stock_data in records]
+
+def stream_tables(tickers, max_workers=None, client=None, batch_size=None):
+    """Fetch tickers like get_stock_table, yielding each request's StockTable as soon as it completes.
+
+    Tables arrive in completion order, not input order, so later stages
+    can start on the first quotes while the rest are still being fetched.
+    """
+    tickers = list(tickers)
+    if not tickers:
+        return
+    headers = get_headers()
+    if client is None:
+        client = get_client()
+    if batch_size is None:
+        batch_size = QUOTE_BATCH_SIZE
+    
+    def work(unit):
+        quote = fetch_stock_data(unit, headers, client)
+        return parse_quotes_to_table([quote] if quote else [])
+    
+    units = [",".join(chunk) for chunk in chunk_tickers(tickers, batch_size)]
+    if max_workers is None:
+        max_workers = FETCH_MAX_WORKERS
+    max_workers = max(1, min(max_workers, len(units)))
+    if max_workers == 1:
+        for unit in units:
+            yield work(unit)
+        return
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch") as executor:
+        futures = [executor.submit(work, unit) for unit in units]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
 def save_to_json(data, filename="stock_data.json"):
     """Save data to a JSON file."""
     try:
@@ -85,7 +383,7 @@ def save_to_json(data, filename="stock_data.json"):
         data_dir.mkdir(exist_ok=True)
         
         file_path = data_dir / filename
-        with open(file_path, 'w') as json_file:
+        with metrics.timer("save.json"), open(file_path, 'w') as json_file:
             json.dump(data, json_file, indent=4)
         logger.info(f"Data saved to {file_path}")
         return True
@@ -8,9 +8,103 @@ load_dotenv()
 # API configuration
 RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
 RAPIDAPI_HOST = os.getenv("RAPIDAPI_HOST", "yahoo-finance15.p.rapidapi.com")
+# Set to 0 to talk plain HTTP, e.g. to a local stand-in server
+RAPIDAPI_HTTPS = os.getenv("RAPIDAPI_HTTPS", "1") != "0"
+
+# Keep-alive connection pool for the quote API
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "8"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+# API plan limits (0 = unlimited); monthly usage is kept in API_USAGE_FILE
+API_REQUESTS_PER_SECOND = float(os.getenv("API_REQUESTS_PER_SECOND", "5"))
+API_REQUESTS_PER_MONTH = int(os.getenv("API_REQUESTS_PER_MONTH", "0"))
+
+# Failed requests (429, 5xx, network errors) are retried with jittered
+# exponential backoff starting at HTTP_BACKOFF_BASE seconds, capped at
+# HTTP_BACKOFF_MAX; a Retry-After header is honoured up to that cap
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+
+# Circuit breaker: stop calling the API for CIRCUIT_RESET_TIMEOUT seconds
+# after CIRCUIT_FAILURE_THRESHOLD consecutive failures
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+# Number of tickers fetched in parallel (1 = serial)
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "8"))
+
+# Maximum tickers packed into one comma-separated quote request (1 = one request per ticker)
+QUOTE_BATCH_SIZE = int(os.getenv("QUOTE_BATCH_SIZE", "1"))
 
 # Default stocks to track
 DEFAULT_TICKERS = ["AAPL", "GOOG", "MSFT", "TSLA"]
 
+# Optional file with a larger ticker universe, used instead of DEFAULT_TICKERS
+TICKERS_FILE = os.getenv("TICKERS_FILE")
+
 # Data storage
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
\ No newline at end of file
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data"))
+
+# Requests sent this month, counted against API_REQUESTS_PER_MONTH
+API_USAGE_FILE = os.path.join(DATA_DIR, "api_usage.json")
+
+# Latest snapshot in binary columnar form (JSON is kept as an export)
+SNAPSHOT_FILE = "stock_data.dvs"
+
+# Append-only snapshot history, partitioned by day
+HISTORY_DIR = os.path.join(DATA_DIR, "history")
+
+# Snapshots written by sharded fetch runs, combined by the merge command
+SHARD_DIR = os.getenv("SHARD_DIR", os.path.join(DATA_DIR, "shards"))
+
+# Quote cache: TTL in seconds per field group, LRU size cap and on-disk location
+QUOTE_CACHE_TTLS = {
+    "price": int(os.getenv("QUOTE_CACHE_PRICE_TTL", "60")),
+    "fundamentals": int(os.getenv("QUOTE_CACHE_FUNDAMENTALS_TTL", str(6 * 3600))),
+    "profile": int(os.getenv("QUOTE_CACHE_PROFILE_TTL", str(24 * 3600))),
+}
+QUOTE_CACHE_MAX_ENTRIES = int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", "10000"))
+QUOTE_CACHE_FILE = os.path.join(DATA_DIR, "quote_cache.json")
+
+# Processes used to render charts (1 = render in-process)
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "1"))
+
+# Charts show the N largest entries plus an "Other" bucket (0 = show all)
+CHART_TOP_N = int(os.getenv("CHART_TOP_N", "20"))
+
+# Daemon polling: seconds between polls, faster for symbols whose absolute
+# % change reaches VOLATILITY_THRESHOLD, slower outside market hours.
+# POLL_INTERVALS overrides single tickers, e.g. "TSLA=10,AAPL=30".
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "60"))
+VOLATILE_POLL_INTERVAL = float(os.getenv("VOLATILE_POLL_INTERVAL", "15"))
+VOLATILITY_THRESHOLD = float(os.getenv("VOLATILITY_THRESHOLD", "2.0"))
+OFF_HOURS_BACKOFF = float(os.getenv("OFF_HOURS_BACKOFF", "10"))
+POLL_INTERVALS = {
+    ticker.strip(): float(seconds)
+    for ticker, _, seconds in (item.partition("=") for item in os.getenv("POLL_INTERVALS", "").split(","))
+    if ticker.strip() and seconds
+}
+
+# Log directory; run metrics (counters and latency histograms) are dumped
+# there as JSON at the end of a run, and every METRICS_INTERVAL seconds in
+# daemon mode
+LOG_DIR = os.getenv("LOG_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "logs"))
+METRICS_FILE = os.path.join(LOG_DIR, "metrics.json")
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "300"))
+
+# Snapshots covered by the rolling analytics (moving average, return,
+# volatility, correlation)
+ANALYTICS_WINDOW = int(os.getenv("ANALYTICS_WINDOW", "20"))
+
+# Local chart server (serve command): address and number of rendered
+# images kept in memory
+CHART_SERVER_HOST = os.getenv("CHART_SERVER_HOST", "127.0.0.1")
+CHART_SERVER_PORT = int(os.getenv("CHART_SERVER_PORT", "8050"))
+CHART_SERVER_CACHE_SIZE = int(os.getenv("CHART_SERVER_CACHE_SIZE", "64"))
+
+# Batches of quotes buffered between stages of the pipelined run
+# (fetch_stocks.py --pipeline) before the fetch stage waits
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))
+# Quotes collected before they are appended to the history in one go
+PIPELINE_BATCH_ROWS = int(os.getenv("PIPELINE_BATCH_ROWS", "250"))
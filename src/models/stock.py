@@ -1,6 +1,96 @@
+import numpy as np
+
+# Columnar layout of a stock record used by the snapshot stores: numeric
+# fields are stored as float64 (NaN for missing), string fields are
+# dictionary-encoded. The "range"/"52wk_range" strings of a record are
+# split into their low/high numbers.
+NUMERIC_FIELDS = (
+    "price", "change", "percent", "volume", "day_low", "day_high",
+    "market_cap", "pe_ratio", "eps", "week52_low", "week52_high",
+    "dividend_yield", "avg_volume",
+)
+STRING_FIELDS = ("symbol", "name", "analyst_rating", "currency")
+
+# Numeric fields that are integers in a record
+INTEGER_FIELDS = ("volume", "market_cap", "avg_volume")
+
+def parse_range(text):
+    """Split a "low - high" range string into two floats (None when missing)."""
+    parts = (text or "").split(" - ")
+    values = []
+    for part in (parts + [None, None])[:2]:
+        try:
+            values.append(float(part))
+        except (TypeError, ValueError):
+            values.append(None)
+    return tuple(values)
+
+def format_range(low, high):
+    """Format a low/high pair the way records store ranges."""
+    return f"{low} - {high}"
+
+def record_to_row(record):
+    """Convert a record dict into a flat row keyed by the columnar field names."""
+    row = {field: record.get(field) for field in NUMERIC_FIELDS + STRING_FIELDS}
+    row["day_low"], row["day_high"] = parse_range(record.get("range"))
+    row["week52_low"], row["week52_high"] = parse_range(record.get("52wk_range"))
+    return row
+
+def row_to_record(row):
+    """Convert a flat columnar row back into a record dict."""
+    values = {}
+    for field in NUMERIC_FIELDS:
+        value = row.get(field)
+        if value is not None and value != value:  # NaN
+            value = None
+        if value is not None:
+            value = int(value) if field in INTEGER_FIELDS else float(value)
+        values[field] = value
+    for field in STRING_FIELDS:
+        values[field] = row.get(field)
+    return {
+        "symbol": values["symbol"],
+        "name": values["name"],
+        "price": values["price"],
+        "change": values["change"],
+        "percent": values["percent"],
+        "volume": values["volume"],
+        "range": format_range(values["day_low"], values["day_high"]),
+        "market_cap": values["market_cap"],
+        "pe_ratio": values["pe_ratio"],
+        "eps": values["eps"],
+        "52wk_range": format_range(values["week52_low"], values["week52_high"]),
+        "dividend_yield": values["dividend_yield"],
+        "avg_volume": values["avg_volume"],
+        "analyst_rating": values["analyst_rating"],
+        "currency": values["currency"]
+    }
+
+def encode_strings(values):
+    """Dictionary-encode a sequence of strings into (int32 codes, categories); None becomes -1."""
+    categories = []
+    index = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        if value is None or value != value:  # None or NaN
+            codes[i] = -1
+            continue
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(categories)
+            categories.append(value)
+        codes[i] = code
+    return codes, categories
+
 class Stock:
     """Stock data model."""
     
+    __slots__ = (
+        "symbol", "name", "price", "change", "percent", "volume", "day_low", "day_high",
+        "market_cap", "pe_ratio", "eps", "week52_low", "week52_high", "dividend_yield",
+        "avg_volume", "analyst_rating", "currency",
+    )
+    
     def __init__(self, data):
         self.symbol = data.get("symbol")
         self.name = data.get("longName")
@@ -51,22 +141,173 @@ class Stock:
         stock.percent = data.get("percent")
         stock.volume = data.get("volume")
         
-        # Parse range
-        range_str = data.get("range", "").split(" - ")
-        stock.day_low = float(range_str[0]) if len(range_str) > 0 and range_str[0] else None
-        stock.day_high = float(range_str[1]) if len(range_str) > 1 and range_str[1] else None
+        stock.day_low, stock.day_high = parse_range(data.get("range"))
         
         stock.market_cap = data.get("market_cap")
         stock.pe_ratio = data.get("pe_ratio")
         stock.eps = data.get("eps")
         
-        # Parse 52-week range
-        week_range_str = data.get("52wk_range", "").split(" - ")
-        stock.week52_low = float(week_range_str[0]) if len(week_range_str) > 0 and week_range_str[0] else None
-        stock.week52_high = float(week_range_str[1]) if len(week_range_str) > 1 and week_range_str[1] else None
+        stock.week52_low, stock.week52_high = parse_range(data.get("52wk_range"))
         
         stock.dividend_yield = data.get("dividend_yield")
         stock.avg_volume = data.get("avg_volume")
         stock.analyst_rating = data.get("analyst_rating")
         stock.currency = data.get("currency")
-        return stock
\ No newline at end of file
+        return stock
+
+class StockTable:
+    """Struct-of-arrays table holding a whole stock universe.
+
+    Numeric fields (see NUMERIC_FIELDS) are float64 NumPy arrays with NaN
+    for missing values; day and 52-week ranges are kept as their low/high
+    numbers. String fields are int32 codes into a per-column list of
+    categories, with -1 for missing.
+    """
+    
+    __slots__ = ("numeric", "codes", "categories")
+    
+    def __init__(self, numeric, codes, categories):
+        self.numeric = numeric
+        self.codes = codes
+        self.categories = categories
+    
+    def __len__(self):
+        return len(self.codes["symbol"])
+    
+    def column(self, field):
+        """Return a numeric column, or the codes of a string column."""
+        return self.numeric[field] if field in self.numeric else self.codes[field]
+    
+    def strings(self, field):
+        """Decode a string column into an object array (None for missing)."""
+        values = np.array(list(self.categories[field]) + [None], dtype=object)
+        return values[self.codes[field]]
+    
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a table from flat rows keyed by the columnar field names."""
+        numeric = {
+            field: np.array([np.nan if row.get(field) is None else row[field] for row in rows], dtype=np.float64)
+            for field in NUMERIC_FIELDS
+        }
+        codes = {}
+        categories = {}
+        for field in STRING_FIELDS:
+            codes[field], categories[field] = encode_strings([row.get(field) for row in rows])
+        return cls(numeric, codes, categories)
+    
+    @classmethod
+    def from_records(cls, records):
+        """Build a table from record dicts (the JSON/API format)."""
+        return cls.from_rows([record_to_row(r) for r in records if r])
+    
+    @classmethod
+    def from_stocks(cls, stocks):
+        """Build a table from Stock objects."""
+        return cls.from_rows([{field: getattr(stock, field) for field in NUMERIC_FIELDS + STRING_FIELDS}
+                              for stock in stocks])
+    
+    @classmethod
+    def from_dataframe(cls, df):
+        """Build a table from a DataFrame, sharing float64 and categorical data where possible."""
+        import pandas as pd
+
+        numeric = {field: df[field].to_numpy(dtype=np.float64, na_value=np.nan, copy=False)
+                   for field in NUMERIC_FIELDS}
+        codes = {}
+        categories = {}
+        for field in STRING_FIELDS:
+            series = df[field]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes[field] = series.cat.codes.to_numpy().astype(np.int32, copy=False)
+                categories[field] = list(series.cat.categories)
+            else:
+                codes[field], categories[field] = encode_strings(series.tolist())
+        return cls(numeric, codes, categories)
+    
+    @classmethod
+    def concat(cls, tables):
+        """Stack tables row-wise; string columns are re-encoded over the combined categories."""
+        tables = [table for table in tables if table is not None]
+        numeric = {field: np.concatenate([table.numeric[field] for table in tables] or [np.empty(0)])
+                   for field in NUMERIC_FIELDS}
+        codes = {}
+        categories = {}
+        for field in STRING_FIELDS:
+            values = [value for table in tables for value in table.strings(field)]
+            codes[field], categories[field] = encode_strings(values)
+        return cls(numeric, codes, categories)
+    
+    def take(self, indices):
+        """Return a new table with the rows at ``indices``, in that order.
+        
+        String columns keep only the categories those rows use.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        numeric = {field: np.asarray(values)[indices] for field, values in self.numeric.items()}
+        codes = {}
+        categories = {}
+        for field in STRING_FIELDS:
+            taken = np.asarray(self.codes[field])[indices]
+            used = np.unique(taken[taken >= 0])
+            remap = np.full(len(self.categories[field]) + 1, -1, dtype=np.int32)
+            remap[used] = np.arange(len(used), dtype=np.int32)
+            codes[field] = remap[taken]
+            categories[field] = [self.categories[field][code] for code in used]
+        return StockTable(numeric, codes, categories)
+    
+    def select(self, symbols):
+        """Return the rows of ``symbols`` in that order (case-insensitive).
+        
+        Only the first row of a repeated symbol is kept; symbols without a
+        row are skipped.
+        """
+        rows = {}
+        for i, symbol in enumerate(self.strings("symbol")):
+            if symbol is not None:
+                rows.setdefault(symbol.upper(), i)
+        wanted = dict.fromkeys(symbol.upper() for symbol in symbols)
+        order = [rows[symbol] for symbol in wanted if symbol in rows]
+        return self.take(order)
+    
+    def to_dataframe(self):
+        """Build a pandas DataFrame over the columns without copying them.
+
+        String columns become categoricals that share the code arrays.
+        """
+        import pandas as pd
+
+        data = {}
+        for field in STRING_FIELDS:
+            data[field] = pd.Categorical.from_codes(self.codes[field], self.categories[field], validate=False)
+        for field in NUMERIC_FIELDS:
+            data[field] = self.numeric[field]
+        return pd.DataFrame(data, copy=False)
+    
+    def row(self, i):
+        """Return row ``i`` as a flat dict keyed by the columnar field names."""
+        row = {field: self.numeric[field][i] for field in NUMERIC_FIELDS}
+        for field in STRING_FIELDS:
+            code = self.codes[field][i]
+            row[field] = self.categories[field][code] if code >= 0 else None
+        return row
+    
+    def stock(self, i):
+        """Return row ``i`` as a Stock."""
+        stock = Stock.__new__(Stock)
+        for field, value in self.row(i).items():
+            if field in NUMERIC_FIELDS:
+                if value != value:  # NaN
+                    value = None
+                else:
+                    value = int(value) if field in INTEGER_FIELDS else float(value)
+            setattr(stock, field, value)
+        return stock
+    
+    def to_stocks(self):
+        """Convert the table into a list of Stock objects."""
+        return [self.stock(i) for i in range(len(self))]
+    
+    def to_records(self):
+        """Convert the table into a list of record dicts."""
+        return [row_to_record(self.row(i)) for i in range(len(self))]
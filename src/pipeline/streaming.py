@@ -0,0 +1,180 @@
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+
+from src.api.yahoo_finance import stream_tables, save_to_json, display_results, cache_table
+from src.config.config import DATA_DIR, SNAPSHOT_FILE, PIPELINE_QUEUE_SIZE, PIPELINE_BATCH_ROWS
+from src.models.stock import StockTable
+from src.storage.history import SnapshotStore
+from src.storage.snapshot import save_snapshot
+from src.utils.logger import metrics
+
+logger = logging.getLogger(__name__)
+
+# Put on a stage's queue after the last batch
+_DONE = object()
+
+class Stage(threading.Thread):
+    """One pipeline stage: a thread consuming batches from a bounded queue.
+
+    ``handle(batch)`` is called for every batch as it arrives and
+    ``finish()`` once after the last one; its return value is kept as
+    ``result``. When the queue is full, ``put`` blocks the producer
+    (backpressure) instead of letting batches pile up in memory. An error
+    is kept in ``error``; the stage then keeps draining its queue so the
+    producer never blocks on it.
+    """
+
+    def __init__(self, name, handle, finish=None, maxsize=PIPELINE_QUEUE_SIZE):
+        super().__init__(name=f"pipeline-{name}", daemon=True)
+        self.stage = name
+        self.handle = handle
+        self.finish = finish
+        self.queue = queue.Queue(maxsize)
+        self.result = None
+        self.error = None
+
+    def put(self, batch):
+        if self.queue.full():
+            metrics.increment("pipeline.backpressure")
+        self.queue.put(batch)
+
+    def close(self):
+        self.queue.put(_DONE)
+
+    def run(self):
+        done = False
+        try:
+            while not done:
+                batch = self.queue.get()
+                if batch is _DONE:
+                    done = True
+                elif self.error is None:
+                    with metrics.timer(f"pipeline.{self.stage}"):
+                        self.handle(batch)
+            if self.finish is not None:
+                with metrics.timer(f"pipeline.{self.stage}.finish"):
+                    self.result = self.finish()
+        except Exception as e:
+            logger.error(f"Pipeline stage {self.stage} failed: {e}", exc_info=True)
+            self.error = e
+            if not done:
+                while self.queue.get() is not _DONE:
+                    pass
+
+def run_pipeline(tickers, output_dir="charts", cache=None, force_refresh=False, store=None, display=True,
+                 render=True, workers=None, max_workers=None, client=None, batch_size=None):
+    """Fetch, persist, display and chart quotes as a streaming pipeline.
+
+    Fetch workers parse each request's quotes straight into a StockTable
+    and hand it to the persist and display stages through bounded queues,
+    so history appends (in micro-batches of PIPELINE_BATCH_ROWS quotes)
+    and output run while later quotes are still being fetched. Record
+    dicts are built once per batch, for the cache, display and the JSON
+    export only. The snapshot, the JSON export and the charts need the
+    whole universe and are produced once the last batch is in, in
+    parallel: the persist stage writes the files while this thread (pyplot
+    is not thread-safe) draws the charts from the table in memory instead
+    of re-reading the file that was just written. Cached quotes (see
+    get_stock_data) enter the pipeline before the first request; they go
+    to the snapshot but not to the history, which already holds them.
+    Returns the records in ticker order.
+    """
+    tickers = list(tickers)
+    store = store or SnapshotStore()
+    timestamp = time.time()
+
+    arrived = set()
+    cached = []
+    if cache is not None and not force_refresh:
+        cached = [record for record in map(cache.get, tickers) if record is not None]
+        if cached:
+            logger.info(f"Using cached data for {len(cached)} of {len(tickers)} tickers")
+            arrived.update(record["symbol"].upper() for record in cached)
+
+    # Cached quotes only go to the snapshot; the persist stage appends the rest
+    tables = [StockTable.from_records(cached)]
+    records = list(cached)
+    pending = []
+
+    def flush():
+        # Every batch belongs to the same snapshot, so it shares the run's timestamp
+        if pending:
+            store.append(StockTable.concat(pending), timestamp)
+            pending.clear()
+
+    def persist(batch):
+        table, batch_records = batch
+        tables.append(table)
+        records.extend(batch_records)
+        pending.append(table)
+        # Appending one quote at a time would cost an append per ticker
+        if sum(map(len, pending)) >= PIPELINE_BATCH_ROWS:
+            flush()
+
+    def save():
+        flush()
+        table = StockTable.concat(tables).select(tickers)
+        if not len(table):
+            return []
+        by_symbol = {record["symbol"].upper(): record for record in records}
+        ordered = [by_symbol[symbol.upper()] for symbol in table.strings("symbol")]
+        save_snapshot(table, Path(DATA_DIR) / SNAPSHOT_FILE)
+        save_to_json(ordered)
+        return ordered
+
+    stages = [Stage("persist", persist, save)]
+    if display:
+        stages.append(Stage("display", display_results))
+    for stage in stages:
+        stage.start()
+
+    received = list(tables)
+
+    def emit(table, batch_records):
+        received.append(table)
+        stages[0].put((table, batch_records))
+        if display:
+            stages[1].put(batch_records)
+
+    try:
+        if cached and display:
+            stages[1].put(cached)
+        missing = [ticker for ticker in tickers if ticker.upper() not in arrived]
+        wanted = {ticker.upper() for ticker in missing}
+        for table in stream_tables(missing, max_workers, client, batch_size):
+            # Keep the first row of each requested symbol not seen yet; this
+            # only looks at the table's own rows, not at the whole universe
+            keep = []
+            for i, symbol in enumerate(table.strings("symbol")):
+                symbol = symbol.upper()
+                if symbol in wanted and symbol not in arrived:
+                    arrived.add(symbol)
+                    keep.append(i)
+            if keep:
+                emit(*cache_table(table.take(keep), cache))
+    finally:
+        for stage in stages:
+            stage.close()
+
+    try:
+        if render and sum(map(len, received)):
+            # Imported here so runs without charts never load matplotlib
+            from src.visualization.charts import generate_all_charts
+            with metrics.timer("pipeline.charts"):
+                generate_all_charts(output_dir=output_dir, workers=workers,
+                                    stocks_data=StockTable.concat(received).select(tickers))
+    finally:
+        for stage in stages:
+            stage.join()
+
+    failed = [ticker for ticker in tickers if ticker.upper() not in arrived]
+    if failed:
+        metrics.increment("fetch.failed_tickers", len(failed))
+        logger.warning("No data for %d of %d tickers: %s", len(failed), len(tickers), ", ".join(failed))
+    for stage in stages:
+        if stage.error is not None:
+            raise stage.error
+    return stages[0].result or []
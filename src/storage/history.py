@@ -0,0 +1,257 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+
+import numpy as np
+
+from src.config.config import HISTORY_DIR
+from src.models.stock import NUMERIC_FIELDS, STRING_FIELDS, StockTable, row_to_record
+from src.utils.logger import metrics
+
+logger = logging.getLogger(__name__)
+
+# On-disk column types: timestamps in epoch milliseconds, numbers as
+# float64 and strings as int32 codes into a per-partition dictionary.
+TIMESTAMP_DTYPE = np.dtype("<i8")
+NUMERIC_DTYPE = np.dtype("<f8")
+CODE_DTYPE = np.dtype("<i4")
+
+def column_dtype(field):
+    """On-disk dtype of a column."""
+    if field == "timestamp":
+        return TIMESTAMP_DTYPE
+    return CODE_DTYPE if field in STRING_FIELDS else NUMERIC_DTYPE
+
+def to_epoch_ms(value):
+    """Convert a datetime or epoch seconds to epoch milliseconds."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return int(float(value) * 1000)
+
+def partition_name(timestamp_ms):
+    """Name of the daily (UTC) partition holding a timestamp."""
+    day = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+    return f"date={day}"
+
+class SnapshotStore:
+    """Append-only columnar store of quote snapshots keyed by (symbol, timestamp).
+
+    Snapshots are partitioned by UTC day. Each partition directory holds one
+    binary file per column, so appending a snapshot only appends to those
+    files and a range query only reads the columns it needs. The timestamp
+    column is written last and defines the committed row count; columns left
+    longer by an interrupted append are truncated on the next write.
+    """
+
+    def __init__(self, root=HISTORY_DIR):
+        self.root = Path(root)
+        self._dictionaries = {}
+        self._lock = threading.Lock()
+        # Latest-row index: symbol -> (timestamp, partition name, row), and
+        # the rows of each partition already folded into it
+        self._latest = {}
+        self._latest_rows = {}
+
+    def _column_path(self, partition, field):
+        if field == "timestamp":
+            return partition / "timestamp.i8"
+        if field in STRING_FIELDS:
+            return partition / f"{field}.i4"
+        return partition / f"{field}.f8"
+
+    def _dictionary(self, partition, field):
+        """Load the string dictionary of a column as (values, value -> code)."""
+        key = (partition, field)
+        if key not in self._dictionaries:
+            values = []
+            path = partition / f"{field}.dict"
+            if path.exists():
+                with open(path, 'r') as dict_file:
+                    values = [json.loads(line) for line in dict_file]
+            self._dictionaries[key] = (values, {value: code for code, value in enumerate(values)})
+        return self._dictionaries[key]
+
+    def _row_count(self, partition):
+        path = self._column_path(partition, "timestamp")
+        return path.stat().st_size // TIMESTAMP_DTYPE.itemsize if path.exists() else 0
+
+    def _repair(self, partition, rows):
+        """Truncate columns that an interrupted append left longer than ``rows``."""
+        for field in NUMERIC_FIELDS + STRING_FIELDS:
+            path = self._column_path(partition, field)
+            size = rows * column_dtype(field).itemsize
+            if path.exists() and path.stat().st_size > size:
+                os.truncate(path, size)
+
+    def _encode(self, partition, field, codes, categories):
+        """Map table codes onto the partition dictionary, appending new values to it."""
+        dictionary, index = self._dictionary(partition, field)
+        new_values = [value for value in categories if value not in index]
+        for value in new_values:
+            index[value] = len(dictionary)
+            dictionary.append(value)
+        if new_values:
+            with open(partition / f"{field}.dict", 'a') as dict_file:
+                dict_file.writelines(json.dumps(value) + "\n" for value in new_values)
+        # The trailing -1 maps missing values (code -1) to -1
+        mapping = np.array([index[value] for value in categories] + [-1], dtype=CODE_DTYPE)
+        return mapping[codes]
+
+    def append(self, data, timestamp=None):
+        """Append one snapshot (record dicts or a StockTable) taken at ``timestamp``.
+
+        ``timestamp`` is a datetime or epoch seconds and defaults to now.
+        Returns the number of rows written.
+        """
+        table = data if isinstance(data, StockTable) else StockTable.from_records(data)
+        rows = len(table)
+        if not rows:
+            return 0
+        timestamp_ms = to_epoch_ms(time.time() if timestamp is None else timestamp)
+        
+        with self._lock, metrics.timer("save.history"):
+            partition = self.root / partition_name(timestamp_ms)
+            partition.mkdir(parents=True, exist_ok=True)
+            self._repair(partition, self._row_count(partition))
+            
+            columns = {field: np.asarray(table.numeric[field], dtype=NUMERIC_DTYPE) for field in NUMERIC_FIELDS}
+            for field in STRING_FIELDS:
+                columns[field] = self._encode(partition, field, table.codes[field], table.categories[field])
+            columns["timestamp"] = np.full(rows, timestamp_ms, dtype=TIMESTAMP_DTYPE)
+            
+            # Timestamp goes last: it commits the rows
+            for field in NUMERIC_FIELDS + STRING_FIELDS + ("timestamp",):
+                with open(self._column_path(partition, field), 'ab') as column_file:
+                    column_file.write(columns[field].tobytes())
+        
+        logger.info("Appended %d rows to %s", rows, partition)
+        return rows
+
+    def partitions(self, start=None, end=None):
+        """List partition directories, oldest first, overlapping [start, end]."""
+        if not self.root.exists():
+            return []
+        first = partition_name(to_epoch_ms(start)) if start is not None else None
+        last = partition_name(to_epoch_ms(end)) if end is not None else None
+        names = sorted(p.name for p in self.root.iterdir() if p.is_dir() and p.name.startswith("date="))
+        return [self.root / name for name in names
+                if (first is None or name >= first) and (last is None or name <= last)]
+
+    def version(self):
+        """Total committed rows; changes with every append, so it can key caches."""
+        with self._lock:
+            return sum(self._row_count(partition) for partition in self.partitions())
+
+    def _read_column(self, partition, field, rows):
+        if rows == 0:
+            return np.empty(0, dtype=column_dtype(field))
+        return np.memmap(self._column_path(partition, field), dtype=column_dtype(field), mode='r', shape=(rows,))
+
+    def _decode(self, partition, field, codes):
+        dictionary, _ = self._dictionary(partition, field)
+        if len(codes) and codes.max() >= len(dictionary):
+            # Another writer extended the dictionary since it was cached
+            del self._dictionaries[(partition, field)]
+            dictionary, _ = self._dictionary(partition, field)
+        values = np.array(dictionary + [None], dtype=object)
+        return values[codes]  # code -1 picks the trailing None
+
+    def query(self, symbols=None, start=None, end=None, columns=None):
+        """Return snapshot rows between ``start`` and ``end`` (inclusive) as column arrays.
+
+        ``symbols`` restricts the rows to those tickers and ``columns`` to
+        those fields; "timestamp" (epoch ms) and "symbol" are always included.
+        Only the partitions in range are opened, and within them only the
+        requested column files are read.
+        """
+        start_ms, end_ms = to_epoch_ms(start), to_epoch_ms(end)
+        fields = [f for f in (columns or NUMERIC_FIELDS + STRING_FIELDS) if f not in ("timestamp", "symbol")]
+        wanted = set(symbols) if symbols is not None else None
+        chunks = {field: [] for field in ["timestamp", "symbol"] + fields}
+        
+        with self._lock:
+            for partition in self.partitions(start, end):
+                rows = self._row_count(partition)
+                timestamps = self._read_column(partition, "timestamp", rows)
+                mask = np.ones(rows, dtype=bool)
+                if start_ms is not None:
+                    mask &= timestamps >= start_ms
+                if end_ms is not None:
+                    mask &= timestamps <= end_ms
+                symbol_codes = self._read_column(partition, "symbol", rows)
+                if wanted is not None:
+                    _, index = self._dictionary(partition, "symbol")
+                    mask &= np.isin(symbol_codes, [index[s] for s in wanted if s in index])
+                if not mask.any():
+                    continue
+                
+                chunks["timestamp"].append(np.asarray(timestamps[mask]))
+                chunks["symbol"].append(self._decode(partition, "symbol", symbol_codes[mask]))
+                for field in fields:
+                    values = self._read_column(partition, field, rows)[mask]
+                    if field in STRING_FIELDS:
+                        values = self._decode(partition, field, values)
+                    chunks[field].append(np.asarray(values))
+        
+        result = {}
+        for field, parts in chunks.items():
+            if parts:
+                result[field] = np.concatenate(parts)
+            else:
+                result[field] = np.empty(0, dtype=object if field in STRING_FIELDS else column_dtype(field))
+        return result
+
+    def _update_latest(self):
+        """Fold the rows appended since the last call into the latest-row index."""
+        for partition in self.partitions():
+            rows = self._row_count(partition)
+            seen = self._latest_rows.get(partition.name, 0)
+            if rows <= seen:
+                continue
+            timestamps = np.asarray(self._read_column(partition, "timestamp", rows)[seen:])
+            codes = np.asarray(self._read_column(partition, "symbol", rows)[seen:])
+            # Newest new row of each symbol; of rows with the same timestamp the later one wins
+            order = np.lexsort((np.arange(len(codes)), timestamps))[::-1]
+            _, first = np.unique(codes[order], return_index=True)
+            picked = order[first]
+            for symbol, i in zip(self._decode(partition, "symbol", codes[picked]), picked):
+                key = (int(timestamps[i]), partition.name, seen + int(i))
+                if symbol is not None and key > self._latest.get(symbol, (-1,)):
+                    self._latest[symbol] = key
+            self._latest_rows[partition.name] = rows
+
+    def latest(self):
+        """Return the latest snapshot as a list of record dicts: the newest row of every symbol.
+
+        Appends may hold only the quotes that changed (daemon mode), so a
+        symbol missing from the newest append keeps its last stored row, the
+        same forward fill price_matrix assumes. Records keep the order they
+        were stored in. Only the timestamp and symbol columns of rows
+        appended since the previous call are scanned; full rows are read
+        for the picked rows alone.
+        """
+        records = []
+        with self._lock:
+            self._update_latest()
+            picked = sorted((partition, row) for _, partition, row in self._latest.values())
+            for name, group in groupby(picked, key=itemgetter(0)):
+                partition = self.root / name
+                index = np.array([row for _, row in group])
+                rows = self._row_count(partition)
+                columns = {}
+                for field in NUMERIC_FIELDS + STRING_FIELDS:
+                    values = np.asarray(self._read_column(partition, field, rows)[index])
+                    columns[field] = self._decode(partition, field, values) if field in STRING_FIELDS else values
+                records.extend(row_to_record({field: values[i] for field, values in columns.items()})
+                               for i in range(len(index)))
+        return records
@@ -0,0 +1,166 @@
+import json
+import logging
+import mmap
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from src.models.stock import NUMERIC_FIELDS, STRING_FIELDS, StockTable
+from src.utils.logger import metrics
+
+logger = logging.getLogger(__name__)
+
+# File layout:
+#   magic (8 bytes) | header length (uint64) | JSON header | padding
+#   numeric columns (float64) and string code columns (int32), each 64-byte aligned
+#   string dictionary block (JSON: field -> list of values)
+MAGIC = b"DVSNAP01"
+ALIGNMENT = 64
+NUMERIC_DTYPE = np.dtype("<f8")
+CODE_DTYPE = np.dtype("<i4")
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def save_snapshot(data, path):
+    """Write stock records or a StockTable to a binary columnar snapshot file."""
+    try:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = data if isinstance(data, StockTable) else StockTable.from_records(data)
+        n = len(table)
+        
+        arrays = {field: np.asarray(table.numeric[field], dtype=NUMERIC_DTYPE) for field in NUMERIC_FIELDS}
+        arrays.update({field: np.asarray(table.codes[field], dtype=CODE_DTYPE) for field in STRING_FIELDS})
+        dictionaries = {field: list(table.categories[field]) for field in STRING_FIELDS}
+        strings_block = json.dumps(dictionaries).encode("utf-8")
+        
+        # Size the header with oversized placeholder offsets so the real
+        # offsets always fit in the space reserved before the data
+        placeholder = 2 ** 62
+        columns = [{"name": field, "dtype": arrays[field].dtype.str, "offset": placeholder} for field in arrays]
+        header = {"rows": n, "columns": columns, "strings_offset": placeholder,
+                  "strings_length": len(strings_block)}
+        data_start = _align(len(MAGIC) + 8 + len(json.dumps(header).encode("utf-8")))
+        
+        offset = data_start
+        for column in columns:
+            column["offset"] = offset
+            offset = _align(offset + arrays[column["name"]].nbytes)
+        header["strings_offset"] = offset
+        header_bytes = json.dumps(header).encode("utf-8")
+        
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with metrics.timer("save.snapshot"), open(tmp_path, 'wb') as snapshot_file:
+            snapshot_file.write(MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+            for column in columns:
+                snapshot_file.seek(column["offset"])
+                snapshot_file.write(arrays[column["name"]].tobytes())
+            snapshot_file.seek(header["strings_offset"])
+            snapshot_file.write(strings_block)
+        os.replace(tmp_path, path)
+        logger.info("Snapshot saved to %s", path)
+        return True
+    except Exception as e:
+        logger.error(f"Error saving snapshot to {path}: {e}")
+        return False
+
+class Snapshot:
+    """Read-only, memory-mapped view of a binary columnar snapshot.
+
+    The columns are exposed as a StockTable (``table``) whose arrays are
+    backed directly by the mapped file, so opening a snapshot does not
+    parse or copy the data.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a stock snapshot file")
+        header_length, = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(self._mmap[start:start + header_length].decode("utf-8"))
+        
+        rows = header["rows"]
+        columns = {
+            column["name"]: np.frombuffer(self._mmap, dtype=np.dtype(column["dtype"]),
+                                          count=rows, offset=column["offset"])
+            for column in header["columns"]
+        }
+        strings_start = header["strings_offset"]
+        categories = json.loads(
+            self._mmap[strings_start:strings_start + header["strings_length"]].decode("utf-8"))
+        self.table = StockTable(
+            {field: columns[field] for field in NUMERIC_FIELDS},
+            {field: columns[field] for field in STRING_FIELDS},
+            categories,
+        )
+
+    def __len__(self):
+        return len(self.table)
+
+    def column(self, field):
+        """Return a numeric column, or the codes of a string column."""
+        return self.table.column(field)
+
+    def strings(self, field):
+        """Decode a string column into an object array (None for missing)."""
+        return self.table.strings(field)
+
+    def to_dataframe(self):
+        """Build a pandas DataFrame over the mapped columns without copying them."""
+        return self.table.to_dataframe()
+
+    def to_records(self):
+        """Convert the snapshot back into a list of record dicts."""
+        return self.table.to_records()
+
+    def export_json(self, path):
+        """Export the snapshot as a JSON list of records."""
+        with open(path, 'w') as json_file:
+            json.dump(self.to_records(), json_file, indent=4)
+
+    def close(self):
+        """Release the memory map once no arrays or frames built from it are alive."""
+        self.table = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Views are still in use; the map is released when they are collected
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def open_snapshot(path):
+    """Open a binary columnar snapshot file, or return None on failure."""
+    try:
+        return Snapshot(path)
+    except Exception as e:
+        logger.error(f"Error opening snapshot {path}: {e}")
+        return None
+
+def merge_snapshots(paths):
+    """Combine several snapshot files (e.g. per-shard outputs) into one list of records.
+
+    Files are read in the given order; a symbol found in more than one file
+    keeps the record from the last one. Unreadable files are skipped.
+    """
+    merged = {}
+    for path in paths:
+        snapshot = open_snapshot(path)
+        if snapshot is None:
+            continue
+        for record in snapshot.to_records():
+            merged[record["symbol"]] = record
+        snapshot.close()
+    logger.info("Merged %d records from %d snapshots", len(merged), len(paths))
+    return list(merged.values())
@@ -1,12 +1,35 @@
+import atexit
+import bisect
+import json
 import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
 import sys
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
-def setup_logger(log_file=None, log_level=logging.INFO):
-    """Setup logger with console and file handlers."""
+_listener = None
+_queue_handler = None
+_worker_queue = None
+_worker_listener = None
+
+def setup_logger(log_file=None, log_level=logging.INFO, background=True):
+    """Setup logger with console and file handlers.
+
+    With ``background`` (the default) records are put on a queue and
+    written by a listener thread, so logging calls never block on console
+    or file I/O. Call stop_logging() to flush; it also runs at exit.
+    """
+    global _listener, _queue_handler
+    
     # Create logger
     logger = logging.getLogger()
     logger.setLevel(log_level)
+    stop_logging()
     
     # Create formatters
     console_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
@@ -15,23 +38,164 @@ def setup_logger(log_file=None, log_level=logging.INFO):
     # Create console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(console_format)
-    logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # Create file handler if log file is provided
     if log_file:
         log_dir = Path(log_file).parent
-        log_dir.mkdir(exist_ok=True)
+        log_dir.mkdir(parents=True, exist_ok=True)
         
         file_handler = logging.FileHandler(log_file)
         file_handler.setFormatter(file_format)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
     
+    if not background:
+        for handler in handlers:
+            logger.addHandler(handler)
+        return logger
+    
+    log_queue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    logger.addHandler(_queue_handler)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
     return logger
 
+class _Dispatch(logging.Handler):
+    """Hand records received from worker processes to this process's loggers."""
+
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+def worker_log_queue():
+    """Queue through which worker processes log, for init_worker_logging.
+
+    Records put on it by any process are handled by the loggers of this
+    process (and reach its console and log file) through a listener thread
+    that is started on first use and stopped by stop_logging().
+    """
+    global _worker_queue, _worker_listener
+    if _worker_listener is None:
+        _worker_queue = multiprocessing.Queue()
+        _worker_listener = logging.handlers.QueueListener(_worker_queue, _Dispatch())
+        _worker_listener.start()
+    return _worker_queue
+
+def init_worker_logging(log_queue, log_level=logging.INFO):
+    """Process pool initializer: send this worker's log records to ``log_queue``.
+
+    Forked workers inherit the parent's queue handler, whose listener does
+    not run in the worker, so their records would otherwise be lost.
+    """
+    logger = logging.getLogger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(log_level)
+
+def stop_logging():
+    """Flush queued log records and stop the background listeners, if any."""
+    global _listener, _queue_handler, _worker_queue, _worker_listener
+    # Worker records go through the root logger, so flush them first
+    if _worker_listener is not None:
+        _worker_listener.stop()
+        _worker_queue.close()
+        _worker_listener = None
+        _worker_queue = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+atexit.register(stop_logging)
+
 def get_logger(name, log_file=None, log_level=logging.INFO):
     """Get a module logger."""
     # If root logger is not configured, set it up
     if not logging.getLogger().handlers:
         setup_logger(log_file, log_level)
     
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+class Metrics:
+    """Thread-safe run metrics: named counters and latency histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def increment(self, name, value=1):
+        """Add ``value`` to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Record one latency sample in a histogram."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = {
+                    "count": 0, "sum": 0.0, "min": seconds, "max": seconds,
+                    "buckets": [0] * len(LATENCY_BUCKETS),
+                }
+            histogram["count"] += 1
+            histogram["sum"] += seconds
+            histogram["min"] = min(histogram["min"], seconds)
+            histogram["max"] = max(histogram["max"], seconds)
+            histogram["buckets"][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block into histogram ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Return counters and histograms as a JSON-serializable dict."""
+        with self._lock:
+            histograms = {}
+            for name, histogram in self._histograms.items():
+                histograms[name] = {
+                    "count": histogram["count"],
+                    "sum": histogram["sum"],
+                    "mean": histogram["sum"] / histogram["count"],
+                    "min": histogram["min"],
+                    "max": histogram["max"],
+                    "buckets": {("+Inf" if bound == float("inf") else str(bound)): count
+                                for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"])},
+                }
+            return {"counters": dict(self._counters), "histograms": histograms}
+
+    def dump(self, path):
+        """Write the current metrics to a JSON file."""
+        try:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            with open(tmp_path, 'w') as metrics_file:
+                json.dump(dict(self.snapshot(), time=time.time()), metrics_file, indent=4)
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            logging.getLogger(__name__).error("Error writing metrics to %s: %s", path, e)
+            return False
+
+    def reset(self):
+        """Drop all counters and histograms."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+# Process-wide metrics registry
+metrics = Metrics()
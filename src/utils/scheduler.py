@@ -0,0 +1,83 @@
+import heapq
+import logging
+import time
+from datetime import datetime, time as dt_time
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+    ZoneInfoNotFoundError = Exception
+
+from src.config.config import (POLL_INTERVAL, VOLATILE_POLL_INTERVAL, VOLATILITY_THRESHOLD,
+                               OFF_HOURS_BACKOFF, POLL_INTERVALS)
+
+logger = logging.getLogger(__name__)
+
+MARKET_TIMEZONE = "America/New_York"
+MARKET_OPEN = dt_time(9, 30)
+MARKET_CLOSE = dt_time(16, 0)
+
+_market_tz = None
+
+def is_market_open(now=None):
+    """Whether US equity markets are in regular trading hours (holidays are not modelled)."""
+    global _market_tz
+    if _market_tz is None:
+        try:
+            _market_tz = ZoneInfo(MARKET_TIMEZONE)
+        except (TypeError, ZoneInfoNotFoundError):
+            logger.warning(f"Time zone {MARKET_TIMEZONE} unavailable; treating the market as always open")
+            return True
+    now = datetime.now(_market_tz) if now is None else datetime.fromtimestamp(now, _market_tz)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+class PollScheduler:
+    """Per-ticker polling schedule.
+
+    Each ticker is polled at its own interval: POLL_INTERVALS overrides,
+    otherwise VOLATILE_POLL_INTERVAL when its last absolute % change is at
+    least VOLATILITY_THRESHOLD, else POLL_INTERVAL. Outside market hours
+    every interval is multiplied by OFF_HOURS_BACKOFF.
+    """
+
+    def __init__(self, tickers, interval=POLL_INTERVAL, volatile_interval=VOLATILE_POLL_INTERVAL,
+                 volatility_threshold=VOLATILITY_THRESHOLD, off_hours_backoff=OFF_HOURS_BACKOFF,
+                 intervals=None, market_open=is_market_open):
+        self.interval = interval
+        self.volatile_interval = volatile_interval
+        self.volatility_threshold = volatility_threshold
+        self.off_hours_backoff = off_hours_backoff
+        self.intervals = dict(POLL_INTERVALS if intervals is None else intervals)
+        self.market_open = market_open
+        now = time.time()
+        self._queue = [(now, ticker) for ticker in tickers]
+        heapq.heapify(self._queue)
+
+    def interval_for(self, ticker, record=None, now=None):
+        """Seconds until ``ticker`` should be polled again after returning ``record``."""
+        interval = self.intervals.get(ticker)
+        if interval is None:
+            percent = record.get("percent") if record else None
+            volatile = percent is not None and abs(percent) >= self.volatility_threshold
+            interval = self.volatile_interval if volatile else self.interval
+        if not self.market_open(now):
+            interval *= self.off_hours_backoff
+        return interval
+
+    def due(self, now=None):
+        """Pop and return the tickers whose poll time has come."""
+        now = time.time() if now is None else now
+        tickers = []
+        while self._queue and self._queue[0][0] <= now:
+            tickers.append(heapq.heappop(self._queue)[1])
+        return tickers
+
+    def schedule(self, ticker, record=None, now=None):
+        """Queue the next poll of ``ticker``."""
+        now = time.time() if now is None else now
+        heapq.heappush(self._queue, (now + self.interval_for(ticker, record, now), ticker))
+
+    def next_poll(self):
+        """Time of the next scheduled poll, or None when nothing is scheduled."""
+        return self._queue[0][0] if self._queue else None
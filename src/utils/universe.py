@@ -0,0 +1,113 @@
+import csv
+import logging
+import re
+import zlib
+from pathlib import Path
+
+from src.config.config import DEFAULT_TICKERS, TICKERS_FILE, SHARD_DIR
+
+logger = logging.getLogger(__name__)
+
+# Name of a shard snapshot written by shard_path, e.g. stock_data.2-of-8.dvs
+SHARD_NAME = re.compile(r"stock_data\.(\d+)-of-(\d+)\.dvs")
+
+def load_universe(path):
+    """Load tickers from a file, upper-cased and de-duplicated in file order.
+
+    Plain text files hold tickers separated by newlines, commas or spaces;
+    ``#`` starts a comment. CSV files use their "symbol" column, or the
+    first column when there is no such header.
+    """
+    path = Path(path)
+    tickers = []
+    with open(path, 'r', newline='') as universe_file:
+        if path.suffix.lower() == ".csv":
+            rows = list(csv.reader(universe_file))
+            header = [cell.strip().lower() for cell in rows[0]] if rows else []
+            column = header.index("symbol") if "symbol" in header else 0
+            if "symbol" in header:
+                rows = rows[1:]
+            tickers = [row[column] for row in rows if len(row) > column]
+        else:
+            for line in universe_file:
+                tickers.extend(line.split("#", 1)[0].replace(",", " ").split())
+    universe = list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+    logger.info("Loaded %d tickers from %s", len(universe), path)
+    return universe
+
+def default_universe():
+    """Tickers from TICKERS_FILE if set, otherwise DEFAULT_TICKERS."""
+    return load_universe(TICKERS_FILE) if TICKERS_FILE else list(DEFAULT_TICKERS)
+
+def parse_shard(text):
+    """Parse an "INDEX/COUNT" shard spec such as "0/4" into (index, count)."""
+    index, _, count = str(text).partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Shard must look like INDEX/COUNT, got {text!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be between 0 and {count - 1}, got {text!r}")
+    return index, count
+
+def shard_of(ticker, count):
+    """Shard a ticker belongs to.
+
+    Uses CRC32 of the upper-cased symbol, which (unlike ``hash``) is the
+    same in every process and on every machine, so independent workers
+    agree on the split without coordinating.
+    """
+    return zlib.crc32(ticker.upper().encode("utf-8")) % count
+
+def select_shard(tickers, index, count):
+    """The tickers of shard ``index`` out of ``count``, in their original order."""
+    return [ticker for ticker in tickers if shard_of(ticker, count) == index]
+
+def shard_path(index, count, shard_dir=SHARD_DIR, suffix=".dvs"):
+    """Per-shard output file, e.g. stock_data.2-of-8.dvs."""
+    return Path(shard_dir) / f"stock_data.{index}-of-{count}{suffix}"
+
+def pending_path(index, count, timestamp, shard_dir=SHARD_DIR):
+    """File holding the quotes one run of a shard fetched at ``timestamp`` until merge appends them."""
+    return shard_path(index, count, shard_dir, suffix=f".{int(timestamp * 1000)}.pending.dvs")
+
+def pending_files(index, count, shard_dir=SHARD_DIR):
+    """(timestamp, path) of every not yet merged run of a shard, oldest first."""
+    runs = []
+    for path in Path(shard_dir).glob(f"stock_data.{index}-of-{count}.*.pending.dvs"):
+        stamp = path.name.split(".")[2]
+        if stamp.isdigit():
+            runs.append((int(stamp) / 1000, path))
+    return sorted(runs)
+
+def parse_shard_path(path):
+    """(index, count) of a shard snapshot file, or None for any other file."""
+    match = SHARD_NAME.fullmatch(Path(path).name)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+def shard_files(shard_dir=SHARD_DIR, count=None):
+    """Shard snapshot files in ``shard_dir``, ordered by shard index.
+
+    With ``count``, only the files of a COUNT-way split are returned and a
+    missing shard raises FileNotFoundError, so an incomplete run is not
+    merged by accident. Without it the split is taken from the files
+    present; files left over from a split with a different count raise
+    ValueError instead of being mixed in.
+    """
+    if count is not None:
+        paths = [shard_path(index, count, shard_dir) for index in range(count)]
+        missing = [str(path) for path in paths if not path.exists()]
+        if missing:
+            raise FileNotFoundError(f"Missing shard outputs: {', '.join(missing)}")
+        return paths
+
+    splits = {}
+    for path in Path(shard_dir).glob("stock_data.*-of-*.dvs"):
+        shard = parse_shard_path(path)
+        if shard is not None:
+            splits.setdefault(shard[1], []).append((shard[0], path))
+    if len(splits) > 1:
+        counts = ", ".join(str(count) for count in sorted(splits))
+        raise ValueError(f"Shard outputs of different splits ({counts} shards) in {shard_dir}; "
+                         f"pass the shard count or remove the stale files")
+    return [path for _, path in sorted(next(iter(splits.values()), []))]
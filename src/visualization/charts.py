@@ -1,45 +1,177 @@
+import matplotlib
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import hashlib
 import logging
+import time
 import matplotlib.cm as cm
 from matplotlib.patches import Rectangle
 
+from src.analytics.downsample import series_cache
+from src.analytics.timeseries import RollingAnalytics
 from src.api.yahoo_finance import load_from_json
+from src.config.config import DATA_DIR, SNAPSHOT_FILE, CHART_RENDER_WORKERS, CHART_TOP_N, ANALYTICS_WINDOW
+from src.storage.history import SnapshotStore, to_epoch_ms
+from src.storage.snapshot import open_snapshot
+from src.utils.logger import metrics, worker_log_queue, init_worker_logging
+from src.visualization.render_cache import RenderCache, fingerprint_frame
 
 logger = logging.getLogger(__name__)
 
 def load_stock_data(json_file="stock_data.json"):
-    """Load stock data for visualization."""
-    data = load_from_json(json_file)
+    """Load stock data for visualization.
+
+    Binary snapshots (``.dvs``) are memory-mapped instead of parsed; any
+    other file is read as JSON records. A bare file name is looked up in
+    DATA_DIR, a path is used as given. When a snapshot does not exist yet
+    (installs from before binary snapshots), the JSON export next to it is
+    read instead.
+    """
+    path = Path(json_file)
+    if path.suffix == ".dvs":
+        if path.parent == Path("."):
+            path = Path(DATA_DIR) / path
+        if path.exists():
+            data = open_snapshot(path)
+        else:
+            logger.info(f"No snapshot at {path}; reading {path.with_suffix('.json')} instead")
+            data = load_from_json(path.with_suffix(".json").resolve())
+    else:
+        data = load_from_json(json_file)
     if not data:
         logger.error("Failed to load stock data")
         return None
     return data
 
 def create_stock_dataframe(data):
-    """Convert stock data to pandas DataFrame."""
+    """Convert stock data (records or a snapshot) to pandas DataFrame."""
     if not data:
         return None
+    if hasattr(data, "to_dataframe"):
+        return data.to_dataframe()
     return pd.DataFrame(data)
 
-def plot_price_comparison(stocks_data, save_path=None):
+# Analyst rating buckets: upper bound (exclusive), label and colour
+RATING_BUCKETS = [
+    (1.5, 'Strong Buy', '#4CAF50'),
+    (2.5, 'Buy', '#8BC34A'),
+    (3.5, 'Hold', '#FFC107'),
+    (4.5, 'Sell', '#FF9800'),
+    (np.inf, 'Strong Sell', '#F44336'),
+]
+
+def parse_ratings(ratings):
+    """Extract numeric ratings from rating strings (e.g., "2.1 - Buy" -> 2.1); NaN when missing."""
+    ratings = ratings.astype(object).where(ratings.notna(), None)
+    return pd.to_numeric(ratings.str.split(' ').str[0], errors='coerce')
+
+def rating_buckets(values):
+    """Return the colour and label arrays of the rating bucket each value falls in."""
+    values = np.asarray(values, dtype=float)
+    bounds = [bound for bound, _, _ in RATING_BUCKETS]
+    bucket = np.minimum(np.searchsorted(bounds, values, side='right'), len(bounds) - 1)
+    missing = np.isnan(values)
+    colors = np.where(missing, '#9E9E9E', np.array([color for _, _, color in RATING_BUCKETS])[bucket])
+    labels = np.where(missing, 'N/A', np.array([label for _, label, _ in RATING_BUCKETS])[bucket])
+    return colors, labels
+
+def _read_only(values):
+    values = np.asarray(values)
+    values.flags.writeable = False
+    return values
+
+def prepare_stock_frame(data):
+    """Build the DataFrame every chart draws from, once per snapshot.
+
+    Adds the derived columns the charts need, computed vectorized over the
+    whole universe: ``market_cap_billions``, ``volume_millions``,
+    ``avg_volume_millions``, ``rating_value`` (parsed from "2.1 - Buy") and
+    its ``rating_color``/``rating_label`` bucket. The arrays are marked
+    read-only so the frame can be shared by all charts (and the render
+    processes) without one chart changing what the next one sees. A frame
+    that is already prepared is returned as is.
+    """
+    if isinstance(data, pd.DataFrame) and data.attrs.get('prepared'):
+        return data
+    df = create_stock_dataframe(data)
+    if df is None:
+        return None
+    
+    def number(column):
+        return df[column].to_numpy(dtype=float, na_value=np.nan) if column in df else np.full(len(df), np.nan)
+    
+    rating_value = parse_ratings(df['analyst_rating']).to_numpy(dtype=float, na_value=np.nan)
+    rating_color, rating_label = rating_buckets(rating_value)
+    columns = {name: df[name].array if isinstance(df[name].dtype, pd.CategoricalDtype)
+               else _read_only(df[name].to_numpy()) for name in df.columns}
+    columns.update({
+        'market_cap_billions': _read_only(number('market_cap') / 1e9),
+        'volume_millions': _read_only(number('volume') / 1e6),
+        'avg_volume_millions': _read_only(number('avg_volume') / 1e6),
+        'rating_value': _read_only(rating_value),
+        'rating_color': _read_only(rating_color.astype(object)),
+        'rating_label': _read_only(rating_label.astype(object)),
+    })
+    frame = pd.DataFrame(columns, copy=False)
+    frame.attrs['prepared'] = True
+    return frame
+
+# Colours of the original four-ticker charts, used first by palette()
+BASE_COLORS = ['#2196F3', '#4CAF50', '#FFC107', '#F44336']
+
+def palette(n):
+    """Return ``n`` distinct colours for any number of series."""
+    if n <= len(BASE_COLORS):
+        return BASE_COLORS[:n]
+    if n <= 20:
+        return list(cm.tab20(np.arange(n)))
+    return list(cm.hsv(np.linspace(0, 1, n, endpoint=False)))
+
+def top_n_with_other(df, column, top_n=None, agg='sum', key=None):
+    """Keep the ``top_n`` rows with the largest ``column`` and fold the rest into "Other".
+
+    ``key`` optionally ranks rows by a transformed column (e.g. ``abs``).
+    The "Other" row aggregates the remaining numeric values with ``agg``
+    ('sum' or 'mean'). ``top_n`` defaults to CHART_TOP_N; 0 keeps every row.
+    """
+    if top_n is None:
+        top_n = CHART_TOP_N
+    if not top_n or len(df) <= top_n:
+        return df
+    
+    rank = df[column] if key is None else key(df[column])
+    order = rank.fillna(-np.inf).to_numpy().argsort(kind='stable')[::-1]
+    top, rest = df.iloc[order[:top_n]], df.iloc[order[top_n:]]
+    
+    other = {}
+    for name in df.columns:
+        if pd.api.types.is_numeric_dtype(df[name]):
+            other[name] = getattr(rest[name], agg)()
+        else:
+            other[name] = None
+    other['symbol'] = 'Other'
+    other['name'] = f'{len(rest)} other stocks'
+    
+    top = top.astype({name: object for name in ('symbol', 'name') if name in top})
+    return pd.concat([top, pd.DataFrame([other])], ignore_index=True)
+
+def plot_price_comparison(stocks_data, save_path=None, close=False, top_n=None):
     """Create a bar chart comparing current stock prices."""
-    df = create_stock_dataframe(stocks_data)
+    df = prepare_stock_frame(stocks_data)
     if df is None:
         return
+    df = top_n_with_other(df, 'price', top_n, agg='mean')
     
-    plt.figure(figsize=(12, 6))
+    fig = plt.figure(figsize=(12, 6))
     
     # Create bar chart
-    bars = plt.bar(df['symbol'], df['price'], color=['#2196F3', '#4CAF50', '#FFC107', '#F44336'])
+    bars = plt.bar(np.arange(len(df)), df['price'], color=palette(len(df)))
     
     # Add price labels on top of bars
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height + 5,
-                f'${height:.2f}', ha='center', va='bottom', fontweight='bold')
+    plt.bar_label(bars, labels=[f'${price:.2f}' for price in df['price']], padding=3, fontweight='bold')
     
     # Customize chart
     plt.title('Stock Price Comparison', fontsize=18)
@@ -47,41 +179,40 @@ def plot_price_comparison(stocks_data, save_path=None):
     plt.ylabel('Price (USD)', fontsize=14)
     plt.grid(axis='y', alpha=0.3)
     
-    # Add company names as annotations
-    for i, (symbol, name) in enumerate(zip(df['symbol'], df['name'])):
-        plt.annotate(name, (i, 0), xytext=(0, -30), 
-                    textcoords='offset points', ha='center', fontsize=10)
+    # Label each bar with its symbol and company name
+    plt.xticks(np.arange(len(df)), [f'{symbol}\n{name}' for symbol, name in zip(df['symbol'], df['name'])],
+               fontsize=10)
     
     if save_path:
         plt.savefig(save_path, bbox_inches='tight')
         logger.info(f"Chart saved to {save_path}")
     
     plt.tight_layout()
+    if close:
+        plt.close(fig)
     return plt
 
-def plot_performance_comparison(stocks_data, save_path=None):
+def plot_performance_comparison(stocks_data, save_path=None, close=False, top_n=None):
     """Create a horizontal bar chart comparing stock performance (% change)."""
-    df = create_stock_dataframe(stocks_data)
+    df = prepare_stock_frame(stocks_data)
     if df is None:
         return
+    # Keep the biggest movers in either direction
+    df = top_n_with_other(df, 'percent', top_n, agg='mean', key=np.abs)
     
-    plt.figure(figsize=(12, 6))
+    fig = plt.figure(figsize=(12, 6))
     
     # Sort by percent change
     df = df.sort_values('percent')
     
     # Define colors based on positive/negative change
-    colors = ['#F44336' if x < 0 else '#4CAF50' for x in df['percent']]
+    colors = np.where(df['percent'] < 0, '#F44336', '#4CAF50')
     
     # Create horizontal bar chart
     bars = plt.barh(df['symbol'], df['percent'], color=colors)
     
     # Add percent labels
-    for bar in bars:
-        width = bar.get_width()
-        label_x = width + 0.3 if width > 0 else width - 0.3
-        plt.text(label_x, bar.get_y() + bar.get_height()/2, 
-                f'{width:+.2f}%', ha='center', va='center', fontweight='bold')
+    plt.bar_label(bars, labels=[f'{percent:+.2f}%' for percent in df['percent']], padding=3, fontweight='bold')
     
     # Customize chart
     plt.title('Stock Performance Comparison (% Change)', fontsize=18)
@@ -94,23 +225,23 @@ def plot_performance_comparison(stocks_data, save_path=None):
         logger.info(f"Chart saved to {save_path}")
     
     plt.tight_layout()
+    if close:
+        plt.close(fig)
     return plt
 
-def plot_market_cap_comparison(stocks_data, save_path=None):
+def plot_market_cap_comparison(stocks_data, save_path=None, close=False, top_n=None):
     """Create a pie chart comparing market capitalization."""
-    df = create_stock_dataframe(stocks_data)
+    df = prepare_stock_frame(stocks_data)
     if df is None:
         return
+    df = top_n_with_other(df, 'market_cap', top_n, agg='sum')
     
-    plt.figure(figsize=(10, 8))
-    
-    # Convert market cap to billions for readability
-    market_caps_billions = [cap/1e9 for cap in df['market_cap']]
+    fig = plt.figure(figsize=(10, 8))
     
-    # Create pie chart
-    plt.pie(market_caps_billions, labels=df['symbol'], autopct='%1.1f%%', 
+    # Create pie chart (market cap in billions for readability)
+    plt.pie(df['market_cap_billions'], labels=df['symbol'], autopct='%1.1f%%', 
             startangle=90, shadow=False, explode=[0.05]*len(df),
-            colors=['#2196F3', '#4CAF50', '#FFC107', '#F44336'])
+            colors=palette(len(df)))
     
     # Add title and customize
     plt.title('Market Capitalization Comparison (in billions USD)', fontsize=18)
@@ -124,19 +255,22 @@ def plot_market_cap_comparison(stocks_data, save_path=None):
         plt.savefig(save_path, bbox_inches='tight')
         logger.info(f"Chart saved to {save_path}")
     
+    if close:
+        plt.close(fig)
     return plt
 
-def plot_volume_comparison(stocks_data, save_path=None):
+def plot_volume_comparison(stocks_data, save_path=None, close=False, top_n=None):
     """Create a bar chart comparing trading volumes."""
-    df = create_stock_dataframe(stocks_data)
+    df = prepare_stock_frame(stocks_data)
     if df is None:
         return
+    df = top_n_with_other(df, 'volume', top_n, agg='sum')
     
-    plt.figure(figsize=(12, 6))
+    fig = plt.figure(figsize=(12, 6))
     
-    # Convert volume to millions for readability
-    volumes_millions = [vol/1e6 for vol in df['volume']]
-    avg_volumes_millions = [vol/1e6 for vol in df['avg_volume']]
+    # Volumes in millions for readability
+    volumes_millions = df['volume_millions']
+    avg_volumes_millions = df['avg_volume_millions']
     
     # Position bars
     x = np.arange(len(df['symbol']))
@@ -147,10 +281,7 @@ def plot_volume_comparison(stocks_data, save_path=None):
     bars2 = plt.bar(x + width/2, avg_volumes_millions, width, label='3-Month Avg Volume', color='#9C27B0', alpha=0.7)
     
     # Add volume labels
-    for bar in bars1:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height + 1,
-                f'{height:.1f}M', ha='center', va='bottom', fontsize=9)
+    plt.bar_label(bars1, labels=[f'{volume:.1f}M' for volume in volumes_millions], padding=2, fontsize=9)
     
     # Customize chart
     plt.title('Trading Volume Comparison', fontsize=18)
@@ -165,15 +296,18 @@ def plot_volume_comparison(stocks_data, save_path=None):
         logger.info(f"Chart saved to {save_path}")
     
     plt.tight_layout()
+    if close:
+        plt.close(fig)
     return plt
 
-def plot_pe_ratio_comparison(stocks_data, save_path=None):
+def plot_pe_ratio_comparison(stocks_data, save_path=None, close=False, top_n=None):
     """Create a horizontal bar chart comparing P/E ratios."""
-    df = create_stock_dataframe(stocks_data)
+    df = prepare_stock_frame(stocks_data)
     if df is None:
         return
+    df = top_n_with_other(df, 'pe_ratio', top_n, agg='mean')
     
-    plt.figure(figsize=(12, 6))
+    fig = plt.figure(figsize=(12, 6))
     
     # Sort by PE ratio
     df = df.sort_values('pe_ratio')
@@ -185,10 +319,7 @@ def plot_pe_ratio_comparison(stocks_data, save_path=None):
     bars = plt.barh(df['symbol'], df['pe_ratio'], color=colors)
     
     # Add PE ratio labels
-    for bar in bars:
-        width = bar.get_width()
-        plt.text(width + 1, bar.get_y() + bar.get_height()/2, 
-                f'{width:.2f}', ha='left', va='center', fontweight='bold')
+    plt.bar_label(bars, labels=[f'{pe:.2f}' for pe in df['pe_ratio']], padding=3, fontweight='bold')
     
     # Customize chart
     plt.title('Price-to-Earnings (P/E) Ratio Comparison', fontsize=18)
@@ -206,61 +337,35 @@ def plot_pe_ratio_comparison(stocks_data, save_path=None):
         logger.info(f"Chart saved to {save_path}")
     
     plt.tight_layout()
+    if close:
+        plt.close(fig)
     return plt
 
-def plot_analyst_ratings(stocks_data, save_path=None):
+def plot_analyst_ratings(stocks_data, save_path=None, close=False, top_n=None):
     """Visualize analyst ratings for each stock."""
-    df = create_stock_dataframe(stocks_data)
+    df = prepare_stock_frame(stocks_data)
     if df is None:
         return
+    # Show the most bullish ratings (lowest values) first
+    df = top_n_with_other(df, 'rating_value', top_n, agg='mean', key=lambda values: -values)
     
-    plt.figure(figsize=(12, 6))
+    fig = plt.figure(figsize=(12, 6))
     
-    # Extract numeric rating from rating string (e.g., "2.1 - Buy" -> 2.1)
-    ratings = []
-    for rating in df['analyst_rating']:
-        if rating and isinstance(rating, str):
-            try:
-                ratings.append(float(rating.split(' ')[0]))
-            except (ValueError, IndexError):
-                ratings.append(np.nan)
-        else:
-            ratings.append(np.nan)
-    
-    df['rating_value'] = ratings
     df = df.sort_values('rating_value')
     
-    # Define color based on rating (1-1.5: Strong Buy, 1.5-2.5: Buy, 2.5-3.5: Hold, etc.)
-    colors = []
-    labels = []
-    for rating in df['rating_value']:
-        if np.isnan(rating):
-            colors.append('#9E9E9E')  # Gray for N/A
-            labels.append('N/A')
-        elif rating < 1.5:
-            colors.append('#4CAF50')  # Green for Strong Buy
-            labels.append('Strong Buy')
-        elif rating < 2.5:
-            colors.append('#8BC34A')  # Light Green for Buy
-            labels.append('Buy')
-        elif rating < 3.5:
-            colors.append('#FFC107')  # Yellow for Hold
-            labels.append('Hold')
-        elif rating < 4.5:
-            colors.append('#FF9800')  # Orange for Sell
-            labels.append('Sell')
-        else:
-            colors.append('#F44336')  # Red for Strong Sell
-            labels.append('Strong Sell')
+    # Colour by rating bucket (1-1.5: Strong Buy, 1.5-2.5: Buy, 2.5-3.5: Hold, etc.);
+    # the "Other" row gets the bucket of its mean rating
+    colors, labels = df['rating_color'].to_numpy(copy=True), df['rating_label'].to_numpy(copy=True)
+    other = pd.isna(colors)
+    if other.any():
+        colors[other], labels[other] = rating_buckets(df['rating_value'].to_numpy()[other])
     
     # Create horizontal bar chart
     bars = plt.barh(df['symbol'], df['rating_value'], color=colors)
     
     # Add rating labels
-    for i, (bar, label) in enumerate(zip(bars, labels)):
-        width = bar.get_width()
-        plt.text(width + 0.1, bar.get_y() + bar.get_height()/2, 
-                f'{width:.1f} - {label}', ha='left', va='center')
+    plt.bar_label(bars, labels=[f'{value:.1f} - {label}' for value, label in zip(df['rating_value'], labels)],
+                  padding=3)
     
     # Customize chart
     plt.title('Analyst Ratings Comparison', fontsize=18)
@@ -273,31 +378,324 @@ def plot_analyst_ratings(stocks_data, save_path=None):
         logger.info(f"Chart saved to {save_path}")
     
     plt.tight_layout()
+    if close:
+        plt.close(fig)
     return plt
 
+# Above this many symbols the heatmap drops its tick labels
+HEATMAP_MAX_LABELS = 60
+
+def correlation_order(matrix):
+    """Order symbols along the leading eigenvector of a correlation matrix.
+
+    Symbols that move together end up next to each other, so blocks of
+    correlated stocks show up in the heatmap.
+    """
+    filled = np.nan_to_num(matrix)
+    if not len(filled):
+        return np.arange(0)
+    _, vectors = np.linalg.eigh(filled)
+    return np.argsort(vectors[:, -1], kind='stable')
+
+def plot_correlation_heatmap(analytics, save_path=None, close=False, top_n=None):
+    """Visualize the return correlation between every pair of stocks.
+
+    Drawn as a single image, so it stays fast for hundreds of symbols;
+    ``top_n`` is ignored.
+    """
+    matrix = analytics.correlation()
+    order = correlation_order(matrix)
+    matrix = matrix[np.ix_(order, order)]
+    symbols = [analytics.symbols[i] for i in order]
+    
+    size = min(20, max(8, 0.25 * len(symbols)))
+    fig = plt.figure(figsize=(size + 2, size))
+    image = plt.imshow(np.ma.masked_invalid(matrix), cmap='RdBu_r', vmin=-1, vmax=1, interpolation='nearest')
+    plt.colorbar(image, fraction=0.046, pad=0.04, label='Correlation of returns')
+    
+    if len(symbols) <= HEATMAP_MAX_LABELS:
+        plt.xticks(range(len(symbols)), symbols, rotation=90, fontsize=8)
+        plt.yticks(range(len(symbols)), symbols, fontsize=8)
+    else:
+        plt.xticks([])
+        plt.yticks([])
+        plt.xlabel(f'{len(symbols)} stocks, ordered by correlation')
+    
+    plt.title(f'Return Correlation (last {analytics.window} snapshots)', fontsize=18)
+    
+    if save_path:
+        plt.savefig(save_path, bbox_inches='tight')
+        logger.info(f"Chart saved to {save_path}")
+    
+    plt.tight_layout()
+    if close:
+        plt.close(fig)
+    return plt
+
+def plot_risk_return(analytics, save_path=None, close=False, top_n=None):
+    """Visualize rolling return against volatility, coloured by drawdown.
+
+    Every stock is a point; the ``top_n`` most volatile ones are labelled.
+    """
+    summary = analytics.summary()
+    returns = summary['rolling_return'] * 100
+    volatility = summary['volatility'] * 100
+    drawdown = summary['drawdown'] * 100
+    shown = np.isfinite(returns) & np.isfinite(volatility)
+    
+    fig = plt.figure(figsize=(12, 8))
+    points = plt.scatter(volatility[shown], returns[shown], c=np.nan_to_num(drawdown[shown]),
+                         cmap='RdYlGn', vmax=0, s=40, edgecolors='none')
+    plt.colorbar(points, label='Drawdown from peak (%)')
+    
+    if top_n is None:
+        top_n = CHART_TOP_N
+    labelled = np.flatnonzero(shown)
+    if top_n and len(labelled) > top_n:
+        labelled = labelled[np.argsort(volatility[labelled])[::-1][:top_n]]
+    for i in labelled:
+        plt.annotate(summary['symbol'][i], (volatility[i], returns[i]), xytext=(3, 3),
+                     textcoords='offset points', fontsize=8)
+    
+    plt.axhline(0, color='black', linewidth=0.8)
+    plt.title(f'Risk vs Return (last {analytics.window} snapshots)', fontsize=18)
+    plt.xlabel('Volatility of returns (%)', fontsize=14)
+    plt.ylabel('Rolling return (%)', fontsize=14)
+    plt.grid(alpha=0.3)
+    
+    if save_path:
+        plt.savefig(save_path, bbox_inches='tight')
+        logger.info(f"Chart saved to {save_path}")
+    
+    plt.tight_layout()
+    if close:
+        plt.close(fig)
+    return plt
 
-def generate_all_charts(output_dir="charts"):
-    """Generate all stock charts and save to the specified directory."""
+def _history_bound(value):
+    if value is None or isinstance(value, np.datetime64):
+        return value
+    return np.datetime64(to_epoch_ms(value), 'ms')
+
+def plot_price_history(store=None, symbols=None, save_path=None, close=False, top_n=None, start=None, end=None,
+                       method='minmax', figsize=(14, 7)):
+    """Visualize the price history of stocks as lines, downsampled to the image width.
+
+    Each series is reduced to about two points per horizontal pixel with a
+    cached min/max pyramid ('minmax', keeps every spike) or LTTB ('lttb'),
+    so render time and file size depend on the image size, not on how much
+    history is stored. ``symbols`` defaults to the ``top_n`` largest stocks
+    by market cap in the latest snapshot; ``start``/``end`` (datetimes or
+    epoch seconds) zoom into a time range.
+    """
+    store = store or SnapshotStore()
+    if symbols is None:
+        if top_n is None:
+            top_n = CHART_TOP_N
+        latest = sorted(store.latest(), key=lambda record: record.get('market_cap') or 0, reverse=True)
+        symbols = [record['symbol'] for record in latest[:top_n or None]]
+    series = series_cache.get(store, symbols)
+    if not series:
+        logger.error("No price history to plot")
+        return
+    
+    fig, ax = plt.subplots(figsize=figsize)
+    # Two points per pixel of the plotting area
+    width = fig.dpi * fig.get_figwidth() * ax.get_position().width
+    start, end = _history_bound(start), _history_bound(end)
+    
+    points = 0
+    for symbol, color in zip(series, palette(len(series))):
+        x, y = series[symbol].view(width, start, end, method=method)
+        points += len(x)
+        ax.plot(x, y, color=color, linewidth=1.2, label=symbol)
+    
+    plt.title('Price History', fontsize=18)
+    plt.ylabel('Price (USD)', fontsize=14)
+    plt.grid(alpha=0.3)
+    plt.legend(loc='upper left', fontsize=9, ncol=max(1, len(series) // 10))
+    fig.autofmt_xdate()
+    logger.debug("Price history drawn with %d points for %d stocks", points, len(series))
+    
+    if save_path:
+        plt.savefig(save_path, bbox_inches='tight')
+        logger.info(f"Chart saved to {save_path}")
+    
+    plt.tight_layout()
+    if close:
+        plt.close(fig)
+    return plt
+
+# Charts drawn from a RollingAnalytics by generate_analytics_charts
+ANALYTICS_CHARTS = {
+    "correlation_heatmap": plot_correlation_heatmap,
+    "risk_return": plot_risk_return,
+}
+
+# Charts produced by generate_all_charts, saved as <name>.png
+CHARTS = {
+    "price_comparison": plot_price_comparison,
+    "performance_comparison": plot_performance_comparison,
+    "market_cap_comparison": plot_market_cap_comparison,
+    "volume_comparison": plot_volume_comparison,
+    "pe_ratio_comparison": plot_pe_ratio_comparison,
+    "analyst_ratings": plot_analyst_ratings,
+}
+
+# Data columns each chart is drawn from
+CHART_INPUTS = {
+    "price_comparison": ("symbol", "name", "price"),
+    "performance_comparison": ("symbol", "percent"),
+    "market_cap_comparison": ("symbol", "name", "market_cap"),
+    "volume_comparison": ("symbol", "volume", "avg_volume"),
+    "pe_ratio_comparison": ("symbol", "pe_ratio"),
+    "analyst_ratings": ("symbol", "analyst_rating"),
+}
+
+def chart_style():
+    """Style parameters shared by every chart: the plotting code and matplotlib version."""
+    with open(__file__, 'rb') as source_file:
+        source_hash = hashlib.sha256(source_file.read()).hexdigest()
+    return {"source": source_hash, "matplotlib": matplotlib.__version__}
+
+def chart_fingerprints(stocks_data, names=None, top_n=None):
+    """Fingerprint the input columns and style of each named chart."""
+    names = list(CHARTS) if names is None else list(names)
+    df = prepare_stock_frame(stocks_data)
+    style = dict(chart_style(), top_n=CHART_TOP_N if top_n is None else top_n)
+    return {name: fingerprint_frame(df, CHART_INPUTS[name], dict(style, chart=name)) for name in names}
+
+def _init_render_worker(log_queue, log_level):
+    """Switch a render worker process to the headless Agg backend and log through the parent."""
+    matplotlib.use("Agg")
+    init_worker_logging(log_queue, log_level)
+
+def render_chart(name, stocks_data, output_dir, top_n=None):
+    """Render one chart from CHARTS to <output_dir>/<name>.png and close it.
+
+    Returns the render time in seconds.
+    """
+    open_figures = set(plt.get_fignums())
+    start = time.perf_counter()
+    try:
+        CHARTS[name](stocks_data, save_path=Path(output_dir) / f"{name}.png", close=True, top_n=top_n)
+    finally:
+        # Also close the figure if plotting failed half way
+        for number in set(plt.get_fignums()) - open_figures:
+            plt.close(number)
+    return time.perf_counter() - start
+
+def render_charts(stocks_data, output_dir, names=None, workers=None, top_n=None):
+    """Render the named charts (all of CHARTS by default) into ``output_dir``.
+
+    With ``workers`` above 1 (defaults to CHART_RENDER_WORKERS) the charts
+    are spread over a process pool using the Agg backend. Every figure is
+    closed once saved. The stock frame is prepared once and shared by all
+    charts. Returns a dict of chart name -> render seconds.
+    """
+    names = list(CHARTS) if names is None else list(names)
+    stocks_data = prepare_stock_frame(stocks_data)
+    if workers is None:
+        workers = CHART_RENDER_WORKERS
+    workers = max(1, min(workers, len(names)))
+    
+    if workers == 1:
+        timings = {name: render_chart(name, stocks_data, output_dir, top_n) for name in names}
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                                 initargs=(worker_log_queue(), logging.getLogger().level)) as executor:
+            futures = {name: executor.submit(render_chart, name, stocks_data, output_dir, top_n) for name in names}
+            timings = {name: future.result() for name, future in futures.items()}
+    
+    # Workers time their own renders; record them here so they reach this process's metrics
+    for name, seconds in timings.items():
+        metrics.observe(f"render.{name}", seconds)
+    return timings
+
+def generate_all_charts(output_dir="charts", data_file=SNAPSHOT_FILE, workers=None, force=False, top_n=None,
+                        stocks_data=None):
+    """Generate all stock charts and save to the specified directory.
+
+    The charts are drawn from ``stocks_data`` (records, a StockTable or a
+    prepared frame) when given, otherwise from ``data_file``. Charts whose
+    input columns and style are unchanged since they were last rendered
+    into ``output_dir`` are reused unless ``force`` is set. Large universes
+    are reduced to the ``top_n`` largest entries plus "Other".
+    """
     try:
         # Prepare output directory
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
         
         # Load stock data
-        stocks_data = load_stock_data()
-        if not stocks_data:
+        if stocks_data is None:
+            stocks_data = load_stock_data(data_file)
+        if stocks_data is None or not len(stocks_data):
             return False
+        # Built once; the fingerprints and every chart share it
+        stocks_data = prepare_stock_frame(stocks_data)
         
-        # Generate and save original charts
-        plot_price_comparison(stocks_data, save_path=output_path/"price_comparison.png")
-        plot_performance_comparison(stocks_data, save_path=output_path/"performance_comparison.png")
-        plot_market_cap_comparison(stocks_data, save_path=output_path/"market_cap_comparison.png")
-        plot_volume_comparison(stocks_data, save_path=output_path/"volume_comparison.png")
-        plot_pe_ratio_comparison(stocks_data, save_path=output_path/"pe_ratio_comparison.png")
-        plot_analyst_ratings(stocks_data, save_path=output_path/"analyst_ratings.png")
-
+        cache = RenderCache(output_path)
+        fingerprints = chart_fingerprints(stocks_data, top_n=top_n)
+        stale = [name for name, fingerprint in fingerprints.items()
+                 if force or not cache.is_fresh(name, fingerprint, f"{name}.png")]
+        reused = [name for name in fingerprints if name not in stale]
+        
+        timings = render_charts(stocks_data, output_path, names=stale, workers=workers, top_n=top_n) if stale else {}
+        for name, seconds in timings.items():
+            cache.record(name, fingerprints[name])
+            logger.info("Rendered %s in %.0f ms", name, seconds * 1000)
+        cache.save()
+        metrics.increment("render.reused", len(reused))
+        
+        logger.info(f"Charts rebuilt: {', '.join(stale) or 'none'}; reused: {', '.join(reused) or 'none'}")
         logger.info(f"All charts generated and saved to {output_dir}")
         return True
     except Exception as e:
         logger.error(f"Error generating charts: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def generate_analytics_charts(output_dir="charts", analytics=None, store=None, window=None, force=False,
+                              top_n=None):
+    """Generate the charts drawn from the snapshot history (see ANALYTICS_CHARTS).
+
+    Uses an up-to-date RollingAnalytics if given, otherwise builds one from
+    ``store`` (the default SnapshotStore). Needs at least three snapshots;
+    charts are reused when the analytics are unchanged. The downsampled
+    price history chart is drawn as well and reused while the store is
+    unchanged.
+    """
+    try:
+        output_path = Path(output_dir)
+        output_path.mkdir(exist_ok=True)
+        store = store or SnapshotStore()
+        if analytics is None:
+            analytics = RollingAnalytics.from_history(store, window or ANALYTICS_WINDOW)
+        if analytics.updates < 3:
+            logger.info(f"Not enough history for analytics charts ({analytics.updates} snapshots)")
+            return False
+        
+        cache = RenderCache(output_path)
+        summary = pd.DataFrame(analytics.summary())
+        style = dict(chart_style(), window=analytics.window, top_n=CHART_TOP_N if top_n is None else top_n,
+                     correlation=hashlib.sha256(analytics.correlation().tobytes()).hexdigest())
+        for name, plot in ANALYTICS_CHARTS.items():
+            fingerprint = fingerprint_frame(summary, list(summary.columns), dict(style, chart=name))
+            if not force and cache.is_fresh(name, fingerprint, f"{name}.png"):
+                metrics.increment("render.reused")
+                continue
+            with metrics.timer(f"render.{name}"):
+                plot(analytics, save_path=output_path / f"{name}.png", close=True, top_n=top_n)
+            cache.record(name, fingerprint)
+        
+        fingerprint = fingerprint_frame(summary, [], dict(style, chart="price_history", history=store.version()))
+        if force or not cache.is_fresh("price_history", fingerprint, "price_history.png"):
+            with metrics.timer("render.price_history"):
+                plot_price_history(store, save_path=output_path / "price_history.png", close=True, top_n=top_n)
+            cache.record("price_history", fingerprint)
+        cache.save()
+        logger.info(f"Analytics charts for {len(analytics)} stocks saved to {output_dir}")
+        return True
+    except Exception as e:
+        logger.error(f"Error generating analytics charts: {e}")
+        return False
@@ -0,0 +1,302 @@
+import logging
+import time
+
+import numpy as np
+from matplotlib import cm
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.image import imsave
+
+from src.config.config import CHART_TOP_N
+from src.utils.logger import metrics
+from src.visualization.charts import prepare_stock_frame, palette, rating_buckets, top_n_with_other
+
+logger = logging.getLogger(__name__)
+
+# Fraction of the largest value kept free above it, so small moves do not
+# force the axis limits (and with them the static background) to change
+HEADROOM = 0.25
+
+class BarPanel:
+    """One dashboard chart whose bars and labels are updated in place.
+
+    The bars, their labels and the axis layout are created once per set of
+    symbols. Later snapshots only change bar lengths, colours and label
+    text; the static parts (axes, ticks, titles) are rebuilt only when the
+    symbols shown change or a value no longer fits the axis limits.
+    """
+
+    def __init__(self, ax, title, column, horizontal=False, label_format='{:.2f}', colors=None,
+                 agg='sum', rank_key=None, scale=1.0, xlabel=None, ylabel=None, limits=None):
+        self.ax = ax
+        self.title = title
+        self.column = column
+        self.horizontal = horizontal
+        self.label_format = label_format
+        self.colors = colors or (lambda df: palette(len(df)))
+        self.agg = agg
+        self.rank_key = rank_key
+        self.scale = scale
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.fixed_limits = limits
+        self.symbols = None
+        self.bars = []
+        self.labels = []
+        self.values = None
+        self.limits = None
+
+    def select(self, df, top_n):
+        """Reduce the universe to the rows this panel shows."""
+        columns = ['symbol', 'name', self.column]
+        return top_n_with_other(df[columns], self.column, top_n, agg=self.agg, key=self.rank_key)
+
+    def _values(self, df):
+        return df[self.column].to_numpy(dtype=float) / self.scale
+
+    def _limits(self, values):
+        if self.fixed_limits is not None:
+            return self.fixed_limits
+        finite = values[np.isfinite(values)]
+        low = min(0.0, finite.min()) if len(finite) else 0.0
+        high = max(0.0, finite.max()) if len(finite) else 1.0
+        span = (high - low) or 1.0
+        return (low - HEADROOM * span if low < 0 else 0.0, high + HEADROOM * span)
+
+    def _fits(self, values):
+        if self.fixed_limits is not None:
+            return True
+        finite = values[np.isfinite(values)]
+        if not len(finite):
+            return True
+        low, high = self.limits
+        # Also rebuild when the data shrank to a small part of the axis
+        return low <= finite.min() and finite.max() <= high and \
+            (finite.max() - min(0.0, finite.min())) >= (high - low) / 4
+
+    def layout(self, df):
+        """Create the axes content for the symbols in ``df``."""
+        ax = self.ax
+        ax.clear()
+        values = self._values(df)
+        positions = np.arange(len(df))
+        draw = ax.barh if self.horizontal else ax.bar
+        container = draw(positions, np.nan_to_num(values), color=self.colors(df), animated=True)
+        self.bars = list(container)
+        self.labels = [ax.text(0, 0, '', animated=True, clip_on=True, fontsize=9,
+                               ha='left' if self.horizontal else 'center',
+                               va='center' if self.horizontal else 'bottom')
+                       for _ in positions]
+
+        self.symbols = list(df['symbol'])
+        if self.horizontal:
+            ax.set_yticks(positions, self.symbols)
+        else:
+            ax.set_xticks(positions, self.symbols, rotation=45 if len(df) > 8 else 0)
+        self.limits = self._limits(values)
+        (ax.set_xlim if self.horizontal else ax.set_ylim)(*self.limits)
+        ax.set_title(self.title, fontsize=14)
+        if self.xlabel:
+            ax.set_xlabel(self.xlabel)
+        if self.ylabel:
+            ax.set_ylabel(self.ylabel)
+        ax.grid(axis='x' if self.horizontal else 'y', alpha=0.3)
+        self.values = None
+        self._set_values(df, values)
+
+    def _set_values(self, df, values):
+        """Update bar lengths, colours and labels that changed; return whether any did."""
+        previous = self.values
+        changed = np.ones(len(values), dtype=bool) if previous is None else \
+            ~((values == previous) | (np.isnan(values) & np.isnan(previous)))
+        if not changed.any():
+            return False
+        colors = self.colors(df)
+        for i in np.flatnonzero(changed):
+            bar, label, value = self.bars[i], self.labels[i], values[i]
+            length = 0.0 if np.isnan(value) else value
+            if self.horizontal:
+                bar.set_width(length)
+                label.set_position((length, bar.get_y() + bar.get_height() / 2))
+                label.set_horizontalalignment('right' if length < 0 else 'left')
+            else:
+                bar.set_height(length)
+                label.set_position((bar.get_x() + bar.get_width() / 2, length))
+            bar.set_color(colors[i])
+            label.set_text(self.label_format(value, df.iloc[i]) if callable(self.label_format)
+                           else self.label_format.format(value))
+        self.values = values
+        return True
+
+    def update(self, df):
+        """Apply a new selection; return 'layout', 'artists' or None for what changed."""
+        symbols = list(df['symbol'])
+        if self.symbols is not None and symbols != self.symbols and sorted(symbols) == sorted(self.symbols):
+            # Same symbols in a new rank order: keep the bars where they are
+            df = df.iloc[[symbols.index(symbol) for symbol in self.symbols]]
+            symbols = self.symbols
+        values = self._values(df)
+        if symbols != self.symbols or not self._fits(values):
+            self.layout(df)
+            return 'layout'
+        return 'artists' if self._set_values(df, values) else None
+
+    def artists(self):
+        """Artists redrawn on every blit of this panel."""
+        return self.bars + self.labels
+
+class PiePanel(BarPanel):
+    """Dashboard pie chart whose wedges are re-angled in place."""
+
+    def layout(self, df):
+        ax = self.ax
+        ax.clear()
+        values = self._values(df)
+        wedges, _ = ax.pie(np.ones(len(df)), colors=self.colors(df), startangle=90,
+                           wedgeprops={'animated': True})
+        self.bars = list(wedges)
+        self.labels = [ax.text(0, 0, '', animated=True, ha='center', va='center', fontsize=9)
+                       for _ in self.bars]
+        self.symbols = list(df['symbol'])
+        ax.legend(self.bars, [f"{symbol} - {name}" for symbol, name in zip(df['symbol'], df['name'])],
+                  loc='center left', bbox_to_anchor=(1.0, 0.5), fontsize=8)
+        ax.set_title(self.title, fontsize=14)
+        ax.axis('equal')
+        self.values = None
+        self._set_values(df, values)
+
+    def _fits(self, values):
+        return True
+
+    def _set_values(self, df, values):
+        previous = self.values
+        if previous is not None and np.array_equal(values, previous, equal_nan=True):
+            return False
+        shares = np.nan_to_num(values)
+        total = shares.sum() or 1.0
+        ends = 90 + 360 * np.cumsum(shares) / total
+        starts = np.concatenate([[90], ends[:-1]])
+        for wedge, label, symbol, start, end, share in zip(self.bars, self.labels, self.symbols,
+                                                           starts, ends, shares):
+            wedge.set_theta1(start)
+            wedge.set_theta2(end)
+            middle = np.deg2rad((start + end) / 2)
+            label.set_position((0.7 * np.cos(middle), 0.7 * np.sin(middle)))
+            # Leave slivers unlabelled; the legend names them
+            label.set_text(f"{symbol}\n{100 * share / total:.1f}%" if share / total >= 0.03 else '')
+        self.values = values
+        return True
+
+class Dashboard:
+    """Live dashboard of the stock charts, updated in place on each snapshot.
+
+    The figure and all bar/wedge/label artists are created once. Each call
+    to ``update`` changes only the artists whose values moved and redraws
+    them with blitting on top of a cached background; the full figure is
+    redrawn only when a panel's layout (symbols shown, axis limits) changes.
+    Memory therefore stays flat however many snapshots are applied.
+
+    By default the figure is headless (Agg); pass a pyplot figure as
+    ``figure`` to display it in an interactive window.
+    """
+
+    def __init__(self, top_n=None, figure=None, figsize=(20, 11)):
+        self.top_n = CHART_TOP_N if top_n is None else top_n
+        if figure is None:
+            figure = Figure(figsize=figsize)
+            FigureCanvasAgg(figure)
+        self.figure = figure
+        self.canvas = figure.canvas
+        axes = figure.subplots(2, 3)
+        self.panels = {
+            "price": BarPanel(axes[0, 0], 'Stock Price', 'price', label_format='${:.2f}',
+                              agg='mean', ylabel='Price (USD)'),
+            "performance": BarPanel(axes[0, 1], 'Performance (% Change)', 'percent', horizontal=True,
+                                    label_format='{:+.2f}%', agg='mean', rank_key=np.abs,
+                                    colors=lambda df: np.where(df['percent'] < 0, '#F44336', '#4CAF50')),
+            "market_cap": PiePanel(axes[0, 2], 'Market Capitalization', 'market_cap', scale=1e9),
+            "volume": BarPanel(axes[1, 0], 'Trading Volume', 'volume', label_format='{:.1f}M',
+                               scale=1e6, ylabel='Volume (Millions)',
+                               colors=lambda df: ['#2196F3'] * len(df)),
+            "pe_ratio": BarPanel(axes[1, 1], 'P/E Ratio', 'pe_ratio', horizontal=True, agg='mean',
+                                 colors=_pe_colors),
+            "analyst_rating": BarPanel(axes[1, 2], 'Analyst Ratings', 'rating_value', horizontal=True,
+                                       agg='mean', rank_key=lambda values: -values, limits=(0, 5.5),
+                                       label_format=_rating_label,
+                                       colors=lambda df: rating_buckets(df['rating_value'])[0]),
+        }
+        self._backgrounds = None
+        self.updates = 0
+
+    def update(self, stocks_data):
+        """Apply a new snapshot and redraw what changed.
+
+        Returns the names of the panels that changed.
+        """
+        start = time.perf_counter()
+        df = prepare_stock_frame(stocks_data)
+        if df is None:
+            return []
+        changes = {name: panel.update(panel.select(df, self.top_n)) for name, panel in self.panels.items()}
+        changed = [name for name, change in changes.items() if change]
+
+        if self._backgrounds is None or 'layout' in changes.values() or not self.canvas.supports_blit:
+            self._full_redraw()
+        else:
+            for name in changed:
+                self._blit(self.panels[name])
+        self.updates += 1
+        seconds = time.perf_counter() - start
+        metrics.observe("render.dashboard", seconds)
+        logger.debug("Dashboard update %d: %s in %.1f ms", self.updates, changed or 'no changes', seconds * 1000)
+        return changed
+
+    def _full_redraw(self):
+        """Draw the static figure, cache each panel's background and draw the animated artists."""
+        self.canvas.draw()
+        if self.canvas.supports_blit:
+            self._backgrounds = {id(panel): self.canvas.copy_from_bbox(panel.ax.bbox)
+                                 for panel in self.panels.values()}
+        for panel in self.panels.values():
+            for artist in panel.artists():
+                panel.ax.draw_artist(artist)
+        if self.canvas.supports_blit:
+            self.canvas.blit(self.figure.bbox)
+        else:
+            self.canvas.draw_idle()
+
+    def _blit(self, panel):
+        """Redraw only one panel's animated artists over its cached background."""
+        self.canvas.restore_region(self._backgrounds[id(panel)])
+        for artist in panel.artists():
+            panel.ax.draw_artist(artist)
+        self.canvas.blit(panel.ax.bbox)
+        self.canvas.flush_events()
+
+    def save(self, path):
+        """Save the current dashboard image.
+
+        Once drawn, the canvas already holds the up-to-date (blitted)
+        pixels, so they are written as they are instead of redrawing the
+        whole figure.
+        """
+        if self.updates and hasattr(self.canvas, 'buffer_rgba'):
+            # Light compression: the file is rewritten on every daemon cycle
+            imsave(path, np.asarray(self.canvas.buffer_rgba()), dpi=self.figure.dpi,
+                   pil_kwargs={'compress_level': 1})
+        else:
+            self.figure.savefig(path)
+
+    def close(self):
+        """Release the figure."""
+        self.figure.clear()
+        self._backgrounds = None
+
+def _pe_colors(df):
+    values = df['pe_ratio']
+    norm = (values - values.min()) / ((values.max() - values.min()) or 1.0)
+    return cm.viridis(norm.fillna(0).to_numpy())
+
+def _rating_label(value, row):
+    _, labels = rating_buckets([value])
+    return f'{value:.1f} - {labels[0]}'
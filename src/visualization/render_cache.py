@@ -0,0 +1,59 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".render_cache.json"
+
+def fingerprint_frame(df, columns, style=None):
+    """Fingerprint the given DataFrame columns together with style parameters."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(style or {}, sort_keys=True, default=str).encode("utf-8"))
+    for column in columns:
+        digest.update(column.encode("utf-8"))
+        if column in df:
+            hashes = pd.util.hash_pandas_object(df[column], index=False).to_numpy()
+            digest.update(hashes.tobytes())
+    return digest.hexdigest()
+
+class RenderCache:
+    """Manifest of the input fingerprint each chart in a directory was rendered from.
+
+    A chart whose current fingerprint matches the manifest, and whose image
+    still exists, does not need to be rendered again.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_NAME
+        self._fingerprints = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as manifest_file:
+                    self._fingerprints = json.load(manifest_file)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable render cache {self.path}: {e}")
+
+    def is_fresh(self, name, fingerprint, filename):
+        """Whether ``filename`` was rendered from inputs with this fingerprint."""
+        return (self._fingerprints.get(name) == fingerprint
+                and (self.output_dir / filename).exists())
+
+    def record(self, name, fingerprint):
+        """Remember the fingerprint a chart was just rendered from."""
+        self._fingerprints[name] = fingerprint
+
+    def save(self):
+        """Write the manifest next to the charts."""
+        try:
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, 'w') as manifest_file:
+                json.dump(self._fingerprints, manifest_file, indent=4, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving render cache {self.path}: {e}")
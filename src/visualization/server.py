@@ -0,0 +1,238 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import matplotlib
+# The server draws off-screen; select the backend before pyplot is imported
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from src.analytics.timeseries import RollingAnalytics
+from src.config.config import (DATA_DIR, SNAPSHOT_FILE, ANALYTICS_WINDOW, CHART_SERVER_HOST, CHART_SERVER_PORT,
+                               CHART_SERVER_CACHE_SIZE)
+from src.storage.history import SnapshotStore
+from src.storage.snapshot import open_snapshot
+from src.utils.logger import metrics
+from src.visualization.charts import CHARTS, ANALYTICS_CHARTS, plot_price_history, chart_style
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+class ChartNotAvailable(Exception):
+    """The data a chart is drawn from does not exist (yet)."""
+
+class ChartRenderer:
+    """Render charts to in-memory PNG/SVG bytes, cached per data version and parameters.
+
+    Snapshot charts (CHARTS) are versioned by the snapshot file's size and
+    modification time, analytics and price history charts by the history
+    store's version. The ETag of a request is derived from that version and
+    the parameters alone, so an unchanged chart can be confirmed (304) or
+    served from the LRU cache without drawing anything.
+    """
+
+    def __init__(self, store=None, snapshot_path=None, cache_size=CHART_SERVER_CACHE_SIZE,
+                 window=ANALYTICS_WINDOW):
+        self.store = store or SnapshotStore()
+        self.snapshot_path = Path(snapshot_path or Path(DATA_DIR) / SNAPSHOT_FILE)
+        self.cache_size = cache_size
+        self.window = window
+        # The chart code and matplotlib version cannot change while serving
+        self.style = chart_style()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # pyplot keeps global state and is not thread-safe
+        self._render_lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_version = None
+        self._analytics = None
+        self._analytics_version = None
+
+    @staticmethod
+    def names():
+        return sorted(list(CHARTS) + list(ANALYTICS_CHARTS) + ["price_history"])
+
+    def data_version(self, name):
+        """Version of the data chart ``name`` is drawn from."""
+        if name in CHARTS:
+            try:
+                stat = os.stat(self.snapshot_path)
+            except FileNotFoundError:
+                raise ChartNotAvailable(f"No snapshot at {self.snapshot_path}; run the fetch command first")
+            return f"snapshot:{stat.st_mtime_ns}:{stat.st_size}"
+        return f"history:{self.store.version()}"
+
+    def etag(self, name, fmt, params, version):
+        key = json.dumps([name, fmt, params, version, self.style], sort_keys=True, default=str)
+        return '"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+    def _load_snapshot(self, version):
+        if self._snapshot_version != version:
+            if self._snapshot is not None:
+                self._snapshot.close()
+            self._snapshot = open_snapshot(self.snapshot_path)
+            self._snapshot_version = version
+        if not self._snapshot:
+            raise ChartNotAvailable(f"Snapshot {self.snapshot_path} could not be read")
+        return self._snapshot
+
+    def _load_analytics(self, version):
+        if self._analytics_version != version:
+            self._analytics = RollingAnalytics.from_history(self.store, self.window)
+            self._analytics_version = version
+        if self._analytics.updates < 3:
+            raise ChartNotAvailable(f"Not enough history for analytics charts ({self._analytics.updates} snapshots)")
+        return self._analytics
+
+    def _draw(self, name, params, version):
+        top_n = params.get("top_n")
+        if name in CHARTS:
+            return CHARTS[name](self._load_snapshot(version), top_n=top_n)
+        if name in ANALYTICS_CHARTS:
+            return ANALYTICS_CHARTS[name](self._load_analytics(version), top_n=top_n)
+        return plot_price_history(self.store, symbols=params.get("symbols"), top_n=top_n,
+                                  start=params.get("start"), end=params.get("end"),
+                                  method=params.get("method", "minmax"))
+
+    def render(self, name, fmt="png", params=None):
+        """Return (etag, image bytes) for a chart, rendering it only on a cache miss."""
+        params = params or {}
+        version = self.data_version(name)
+        etag = self.etag(name, fmt, params, version)
+        with self._lock:
+            if etag in self._cache:
+                self._cache.move_to_end(etag)
+                metrics.increment("server.cache_hits")
+                return etag, self._cache[etag]
+
+        with self._render_lock:
+            open_figures = set(plt.get_fignums())
+            start = time.perf_counter()
+            try:
+                if self._draw(name, params, version) is None:
+                    raise ChartNotAvailable(f"No data to draw {name}")
+                buffer = BytesIO()
+                plt.gcf().savefig(buffer, format=fmt, dpi=params.get("dpi"), bbox_inches='tight')
+            finally:
+                for number in set(plt.get_fignums()) - open_figures:
+                    plt.close(number)
+            seconds = time.perf_counter() - start
+        metrics.observe(f"server.render.{name}", seconds)
+        logger.debug("Rendered %s.%s in %.0f ms", name, fmt, seconds * 1000)
+
+        image = buffer.getvalue()
+        with self._lock:
+            self._cache[etag] = image
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return etag, image
+
+def parse_params(name, query):
+    """Chart parameters from a query string; unknown parameters are ignored."""
+    values = {key: items[-1] for key, items in parse_qs(query).items()}
+    params = {}
+    if "top_n" in values:
+        params["top_n"] = int(values["top_n"])
+    if "dpi" in values:
+        params["dpi"] = min(300, max(50, int(values["dpi"])))
+    if name == "price_history":
+        for key in ("start", "end"):
+            if key in values:
+                params[key] = float(values[key])
+        if "method" in values:
+            if values["method"] not in ("minmax", "lttb"):
+                raise ValueError("method must be 'minmax' or 'lttb'")
+            params["method"] = values["method"]
+        if "symbols" in values:
+            params["symbols"] = [s.strip().upper() for s in values["symbols"].split(",") if s.strip()]
+    return params
+
+class ChartRequestHandler(BaseHTTPRequestHandler):
+    """Serves GET /charts (list of names) and GET /charts/<name>.png|svg.
+
+    Query parameters: ``top_n`` and ``dpi`` for every chart, plus ``start``,
+    ``end`` (epoch seconds), ``method`` and ``symbols`` for price_history.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; do not let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        metrics.increment("server.requests")
+        url = urlsplit(self.path)
+        renderer = self.server.renderer
+        if url.path.rstrip("/") == "/charts":
+            return self._send(200, json.dumps({"charts": renderer.names()}).encode("utf-8"), "application/json")
+
+        name, _, fmt = url.path[len("/charts/"):].rpartition(".")
+        if not url.path.startswith("/charts/") or name not in renderer.names() or fmt not in CONTENT_TYPES:
+            return self._error(404, "Unknown chart")
+        try:
+            params = parse_params(name, url.query)
+            version = renderer.data_version(name)
+            etag = renderer.etag(name, fmt, params, version)
+            if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+                metrics.increment("server.not_modified")
+                return self._send(304, b"", headers={"ETag": etag})
+            etag, image = renderer.render(name, fmt, params)
+        except ValueError as e:
+            return self._error(400, f"Invalid parameter: {e}")
+        except ChartNotAvailable as e:
+            return self._error(404, str(e))
+        except Exception as e:
+            logger.error(f"Error rendering chart {name}: {e}", exc_info=True)
+            return self._error(500, "Error rendering chart")
+        self._send(200, image, CONTENT_TYPES[fmt], {"ETag": etag})
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({"message": message}).encode("utf-8"), "application/json")
+
+    def _send(self, status, body, content_type=None, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        # Clients may keep the image but must revalidate it with the ETag
+        self.send_header("Cache-Control", "no-cache")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+class ChartServer(ThreadingHTTPServer):
+    """Threaded HTTP server sharing one ChartRenderer between requests."""
+
+    daemon_threads = True
+
+    def __init__(self, host=CHART_SERVER_HOST, port=CHART_SERVER_PORT, renderer=None):
+        super().__init__((host, port), ChartRequestHandler)
+        self.renderer = renderer or ChartRenderer()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def serve(host=CHART_SERVER_HOST, port=CHART_SERVER_PORT):
+    """Serve charts until interrupted."""
+    server = ChartServer(host, port)
+    logger.info(f"Serving charts at {server.url}/charts")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping chart server")
+    finally:
+        server.server_close()